@@ -1,3 +1,45 @@
-from .py2opsin import py2opsin
+from .py2opsin import py2opsin, py2opsin_iter
+from .cache import CacheInfo, OpsinCache, OpsinDiskCache
+from .java import (
+    check_java,
+    find_java,
+    set_java,
+    set_jvm_options,
+    stop_cds_archive,
+    use_cds_archive,
+)
+from .jvm import OpsinJVMSession
+from .parallel import py2opsin_parallel
+from .prefilter import classify_name
+from .results import (
+    OpsinResults,
+    ParseFailure,
+    Progress,
+    RelaxedResult,
+    WarmUpReport,
+)
+from .session import OpsinPool, OpsinSession
+from .stats import CallStats, OpsinStats, add_stats_hook, remove_stats_hook
 
 __version__ = "1.1.0"
+
+
+# names from modules which are slow to import (asyncio, argparse and csv,
+# socketserver, mmap), so only loaded for callers who need them
+_LAZY = {
+    "AsyncOpsinSession": "aio",
+    "py2opsin_async": "aio",
+    "ConversionSummary": "bulk",
+    "convert_file": "bulk",
+    "OpsinDaemon": "daemon",
+    "OpsinIndex": "index",
+    "build_index": "index",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+
+        return getattr(importlib.import_module("." + _LAZY[name], __name__), name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -0,0 +1,661 @@
+import contextvars
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+import warnings
+from array import array
+from difflib import get_close_matches
+from itertools import accumulate
+
+from .java import find_java, jvm_options
+from .results import OpsinResults, ParseFailure
+from .stats import count, stage
+
+try:
+    # python < 3.9
+    from importlib.resources import files
+
+    pkg_fopen = lambda fname: files("py2opsin") / fname
+except ImportError:
+    from pkg_resources import resource_filename
+
+    pkg_fopen = lambda fname: resource_filename(__name__, fname)
+
+DEFAULT_JAR = "opsin-cli-2.8.0-jar-with-dependencies.jar"
+
+# representative names, the same as test/data/compound_list.txt, to warm OPSIN up with
+WARMUP_NAMES = "warmup_names.txt"
+
+# command line switch for each of the output formats OPSIN supports
+OUTPUT_FLAGS = {
+    "SMILES": "-osmi",
+    "ExtendedSMILES": "-oextendedsmiles",
+    "CML": "-ocml",
+    "InChI": "-oinchi",
+    "StdInChI": "-ostdinchi",
+    "StdInChIKey": "-ostdinchikey",
+}
+
+# OPSIN prints this to stderr when it is reading names from stdin
+_STDIN_BANNER = "Run the jar using the -h flag for help."
+
+# lines the JVM itself writes to stderr, e.g. with JAVA_TOOL_OPTIONS set, which
+# would otherwise be taken for the message of whichever name failed next
+_JVM_NOISE = re.compile(
+    r"Picked up [A-Z_]+:"
+    r"|(OpenJDK|Java HotSpot\(TM\)) .*warning:"
+    r"|WARNING: "
+    r"|SLF4J: "
+    r"|log4j:"
+    r"|Exception in thread "
+    r"|Caused by: "
+    r"|\s+at "
+)
+
+# how long to wait for OPSIN's error message after a name fails to parse
+_ERROR_WAIT = 0.1
+
+# sent ahead of the names to a freshly started OPSIN watched by name_timeout
+_READY_PROBE = "methane"
+
+# writes smaller than this fit in the pipe buffer and need no writer thread
+_INLINE_WRITE_BYTES = 16384
+
+# sessions entered with a 'with' block in this thread, most recent last
+_ACTIVE_SESSIONS = contextvars.ContextVar("py2opsin_sessions", default=())
+
+
+class TimeoutMessage(str):
+    """Message for a name given up on for taking too long.
+
+    A str so it can be used like any other message, but told apart from
+    OPSIN's own failures so that it is never cached.
+    """
+
+
+class UnpairedMessage(str):
+    """Short message for a failed name when OPSIN's error output could not be split between the names.
+
+    The error output is kept alongside, so warnings can show it once rather
+    than once per failed name.
+    """
+
+    def __new__(cls, value: str, err_str: str):
+        message = super().__new__(cls, value)
+        message.err_str = err_str
+        return message
+
+    def __getnewargs__(self):
+        return (str(self), self.err_str)
+
+
+def resolve_jar(jar_fpath: str) -> str:
+    """Path to the OPSIN jar, swapping in the bundled copy for "default"."""
+    if jar_fpath == "default":
+        return str(pkg_fopen(DEFAULT_JAR))
+    return str(jar_fpath)
+
+
+def warmup_names() -> list:
+    """Names shipped with py2opsin for warming up OPSIN."""
+    with open(str(pkg_fopen(WARMUP_NAMES)), "r", encoding="utf-8") as file:
+        return [line.rstrip("\r\n") for line in file if line.strip()]
+
+
+def jar_identity(jar_fpath: str) -> tuple:
+    """Path, size, and modification time of the jar, to tell versions apart."""
+    jar_fpath = os.path.abspath(resolve_jar(jar_fpath))
+    try:
+        stat = os.stat(jar_fpath)
+    except OSError:
+        return (jar_fpath, None, None)
+    return (jar_fpath, stat.st_size, stat.st_mtime_ns)
+
+
+def build_arg_list(
+    output_format: str,
+    allow_acid: bool,
+    allow_radicals: bool,
+    allow_bad_stereo: bool,
+    wildcard_radicals: bool,
+    jar_fpath: str,
+) -> list:
+    """Command used to launch OPSIN with the given options, less the input file.
+
+    Raises:
+        RuntimeError: output_format is not one OPSIN understands.
+    """
+    # default arguments to start
+    arg_list = [find_java()] + jvm_options() + ["-jar", resolve_jar(jar_fpath)]
+
+    # format the output argument
+    try:
+        arg_list.append(OUTPUT_FLAGS[output_format])
+    except (KeyError, TypeError):
+        possiblity = get_close_matches(
+            output_format,
+            [
+                "SMILES",
+                "CML",
+                "InChI",
+                "StdInChI",
+                "StdInChIKey",
+                "ExtendedSMILES",
+            ],
+            n=1,
+        )
+        addendum = (
+            " Did you mean '{:s}'?".format(possiblity[0])
+            if possiblity
+            else " Try help(py2opsin)."
+        )
+        raise RuntimeError(
+            "Output format {:s} is invalid.".format(output_format) + addendum
+        )
+
+    # grab the optional boolean flags
+    if allow_acid:
+        arg_list.append("-a")
+    if allow_radicals:
+        arg_list.append("-r")
+    if allow_bad_stereo:
+        arg_list.append("-s")
+    if wildcard_radicals:
+        arg_list.append("-w")
+
+    return arg_list
+
+
+def is_opsin_message(line: str) -> bool:
+    """True for a line of stderr which is OPSIN's message about a name."""
+    return bool(line.strip()) and not (
+        line.startswith(_STDIN_BANNER) or _JVM_NOISE.match(line)
+    )
+
+
+def clean_stderr(err_str: str) -> str:
+    """Drop OPSIN's interactive banner and anything from the JVM from captured stderr."""
+    return "\n".join(line for line in err_str.splitlines() if is_opsin_message(line))
+
+
+def pair_messages(outputs: list, err_str: str, names: list = None) -> list:
+    """Attach OPSIN's error lines to the names that failed, in order.
+
+    OPSIN writes one line to stderr per failed name. If the counts disagree
+    each failure is given a short UnpairedMessage instead.
+    """
+    messages = _failure_messages(
+        [i for i, output in enumerate(outputs) if not output], err_str, names
+    )
+    return [(output, messages.get(i)) for i, output in enumerate(outputs)]
+
+
+def _failure_messages(failed: list, err_str: str, names: list = None) -> dict:
+    err_str = clean_stderr(err_str)
+    lines = [line for line in err_str.splitlines() if line.strip()]
+    if len(lines) == len(failed):
+        return dict(zip(failed, lines))
+    # every failure shares the one copy of the error output
+    err_str = err_str or "Could not be parsed."
+    return {
+        i: UnpairedMessage(
+            (
+                "{:s} could not be parsed.".format(names[i])
+                if names is not None and i < len(names)
+                else "Could not be parsed."
+            ),
+            err_str,
+        )
+        for i in failed
+    }
+
+
+def _warning_text(messages) -> str:
+    """Failure messages as one block of text, showing any shared error output only once."""
+    texts = dict.fromkeys(
+        message.err_str if isinstance(message, UnpairedMessage) else message
+        for message in messages
+    )
+    return "\n".join(texts) + "\n"
+
+
+def compact_output(data: bytes, names: list, err_str: str) -> OpsinResults:
+    """OpsinResults made directly from OPSIN's output, pairing messages like pair_messages."""
+    if b"\r" in data:
+        data = data.replace(b"\r\n", b"\n")
+    ends = array("q")
+    failed = []
+    start = 0
+    end = data.find(b"\n")
+    while end != -1:
+        if end == start:
+            failed.append(len(ends))
+        ends.append(end)
+        start = end + 1
+        end = data.find(b"\n", start)
+    messages = _failure_messages(failed, err_str, names)
+    return OpsinResults(
+        data,
+        ends,
+        {
+            i: (names[i] if i < len(names) else "", message)
+            for i, message in messages.items()
+        },
+    )
+
+
+def compact_pairs(names: list, results: list) -> OpsinResults:
+    """OpsinResults holding a list of (output, message) pairs."""
+    encoded = [output.encode("utf-8") for output, _ in results]
+    return OpsinResults(
+        b"".join(output + b"\n" for output in encoded),
+        array("q", (total - 1 for total in accumulate(len(o) + 1 for o in encoded))),
+        {
+            i: (name, message)
+            for i, (name, (_, message)) in enumerate(zip(names, results))
+            if message is not None
+        },
+    )
+
+
+def warn_opsin_errors(err_str: str) -> None:
+    """Raise OPSIN's error output as a single RuntimeWarning."""
+    warnings.warn(
+        "OPSIN raised the following error(s) while parsing:"
+        "\n > " + err_str.replace("\n", "\n > ", err_str.count("\n") - 1),
+        RuntimeWarning,
+    )
+
+
+def finish_results(names: list, results: list, return_failures: bool) -> list:
+    """Turn (output, message) pairs into what py2opsin returns.
+
+    Failures become ParseFailure records if requested, otherwise empty strings
+    with every message collected into a single RuntimeWarning.
+    """
+    messages = [message for _, message in results if message is not None]
+    count("failures", len(messages))
+    if return_failures:
+        return [
+            output if message is None else ParseFailure(name, message)
+            for name, (output, message) in zip(names, results)
+        ]
+
+    # warn user if any of the inputs could not be parsed
+    if messages:
+        with stage("warnings"):
+            warn_opsin_errors(_warning_text(messages))
+    return [output for output, _ in results]
+
+
+def finish_compact(results: OpsinResults, return_failures: bool) -> OpsinResults:
+    """finish_results for OpsinResults, which already hold failures in place."""
+    count("failures", len(results._failures))
+    results.return_failures = return_failures
+    if results._failures and not return_failures:
+        with stage("warnings"):
+            warn_opsin_errors(
+                _warning_text(message for _, message in results.failures())
+            )
+    return results
+
+
+def active_session(jar_fpath: str):
+    """Most recently entered session running the given jar, or None."""
+    jar_fpath = resolve_jar(jar_fpath)
+    for session in reversed(_ACTIVE_SESSIONS.get()):
+        if resolve_jar(session.jar_fpath) == jar_fpath:
+            return session
+    return None
+
+
+def enter_session(registry: contextvars.ContextVar, session) -> None:
+    """Make session the most recent one in registry for this thread."""
+    registry.set(registry.get() + (session,))
+
+
+def exit_session(registry: contextvars.ContextVar, session) -> None:
+    """Remove session from registry for this thread."""
+    sessions = list(registry.get())
+    sessions.remove(session)
+    registry.set(tuple(sessions))
+
+
+def bind_sessions(function):
+    """Wrap function so it uses this thread's sessions when run on another thread."""
+    sessions = _ACTIVE_SESSIONS.get()
+    if not sessions:
+        return function
+
+    def bound(*args, **kwargs):
+        token = _ACTIVE_SESSIONS.set(sessions)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _ACTIVE_SESSIONS.reset(token)
+
+    return bound
+
+
+class OpsinWorker:
+    """A long-lived OPSIN process which reads names on stdin, one per line.
+
+    OPSIN answers every input line with exactly one output line, left empty
+    when the name could not be parsed, and writes the reason to stderr. A
+    background thread drains stderr so the process can never block on it.
+    """
+
+    def __init__(self, arg_list: list):
+        self.arg_list = list(arg_list)
+        self._lock = threading.Lock()
+        self._process = None
+        self.start()
+
+    @property
+    def pid(self):
+        return self._process.pid
+
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        """Launch the OPSIN process if it is not already running."""
+        if self.alive():
+            return
+        self._errors = queue.Queue()
+        # set until OPSIN answers a name, i.e. while the JVM may still be starting
+        self._starting = True
+        count("spawns")
+        self._process = subprocess.Popen(
+            self.arg_list,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        threading.Thread(
+            target=self._drain_stderr,
+            args=(self._process.stderr, self._errors),
+            daemon=True,
+        ).start()
+
+    @staticmethod
+    def _drain_stderr(stream, errors: queue.Queue) -> None:
+        for line in iter(stream.readline, b""):
+            text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+            if is_opsin_message(text):
+                errors.put(text)
+
+    def _write(self, payload: bytes) -> None:
+        try:
+            self._process.stdin.write(payload)
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            # the reader notices the dead or closed process and reports it
+            pass
+
+    def convert(
+        self, names: list, timeout: float = None, name_timeout: float = None
+    ) -> list:
+        """Send names to OPSIN and collect one (output, message) pair per name.
+
+        message is OPSIN's explanation when the name failed and None otherwise.
+        Blank names are failed without consulting OPSIN.
+
+        A name OPSIN spends more than name_timeout seconds on is failed with a
+        TimeoutMessage, OPSIN is restarted, and the rest of the names are sent
+        again. Once timeout seconds have passed since the call began, every
+        name not yet answered is failed in the same way.
+        """
+        if timeout is not None or name_timeout is not None:
+            with self._lock:
+                return self._convert_watched(names, timeout, name_timeout)
+        with self._lock:
+            self.start()
+            # discard messages which arrived after the previous call finished
+            while not self._errors.empty():
+                self._errors.get_nowait()
+
+            with stage("write"):
+                sent = [i for i, name in enumerate(names) if name.strip()]
+                payload = "".join(
+                    names[i].replace("\r", " ").replace("\n", " ") + "\n" for i in sent
+                ).encode("utf-8")
+                count("bytes_in", len(payload))
+
+                # large batches would fill the pipe before we start reading
+                writer = None
+                if len(payload) < _INLINE_WRITE_BYTES:
+                    self._write(payload)
+                else:
+                    writer = threading.Thread(target=self._write, args=(payload,))
+                    writer.start()
+
+            results = [("", "Cannot parse an empty name.")] * len(names)
+            try:
+                with stage("opsin"):
+                    for i in sent:
+                        results[i] = self._read_result(names[i])
+                self._starting = self._starting and not sent
+            except Exception:
+                # the process is out of step with its input, so replace it
+                self._kill()
+                raise
+            finally:
+                if writer is not None:
+                    writer.join()
+            return results
+
+    def _convert_watched(
+        self, names: list, timeout: float, name_timeout: float
+    ) -> list:
+        """convert(), reading OPSIN's output on a thread so waits can be cut short."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        results = [("", "Cannot parse an empty name.")] * len(names)
+        todo = [i for i, name in enumerate(names) if name.strip()]
+        while todo:
+            if deadline is not None and time.monotonic() >= deadline:
+                # no time left to even start OPSIN
+                message = TimeoutMessage("Gave up after {:g} seconds.".format(timeout))
+                for i in todo:
+                    results[i] = ("", message)
+                break
+            self.start()
+            fresh = self._starting
+            while not self._errors.empty():
+                self._errors.get_nowait()
+            payload = "".join(
+                names[i].replace("\r", " ").replace("\n", " ") + "\n" for i in todo
+            ).encode("utf-8")
+            count("bytes_in", len(payload))
+            if fresh:
+                # a name OPSIN is sure to parse, whose answer shows it has started
+                payload = (_READY_PROBE + "\n").encode("utf-8") + payload
+            writer = threading.Thread(target=self._write, args=(payload,), daemon=True)
+            writer.start()
+            lines = queue.Queue()
+            reader = threading.Thread(
+                target=self._read_lines,
+                args=(self._process.stdout, len(todo) + fresh, lines),
+                daemon=True,
+            )
+            reader.start()
+
+            remaining = []
+            try:
+                with stage("opsin"):
+                    if fresh and not self._wait_ready(lines, deadline):
+                        message = TimeoutMessage(
+                            "Gave up after {:g} seconds.".format(timeout)
+                        )
+                        for i in todo:
+                            results[i] = ("", message)
+                        todo = []
+                    self._starting = False
+                    for n, i in enumerate(todo):
+                        wait = name_timeout
+                        if deadline is not None:
+                            left = max(deadline - time.monotonic(), 0)
+                            wait = left if wait is None else min(wait, left)
+                        try:
+                            line = lines.get(timeout=wait)
+                        except queue.Empty:
+                            # OPSIN is stuck on this name, so start over without it
+                            self._kill()
+                            if deadline is not None and time.monotonic() >= deadline:
+                                message = TimeoutMessage(
+                                    "Gave up after {:g} seconds.".format(timeout)
+                                )
+                                for j in todo[n:]:
+                                    results[j] = ("", message)
+                            else:
+                                results[i] = (
+                                    "",
+                                    TimeoutMessage(
+                                        "{:s} took longer than {:g} seconds to parse.".format(
+                                            names[i], name_timeout
+                                        )
+                                    ),
+                                )
+                                remaining = todo[n:][1:]
+                            break
+                        results[i] = self._parse_line(line, names[i])
+            except Exception:
+                self._kill()
+                raise
+            finally:
+                writer.join()
+                reader.join()
+            todo = remaining
+        return results
+
+    def _wait_ready(self, lines: queue.Queue, deadline: float) -> bool:
+        """Wait for OPSIN to answer the readiness probe, so starting the JVM never counts against a name.
+
+        Only the call's deadline applies. False if it passed first, in which case OPSIN is stopped.
+        """
+        wait = None if deadline is None else max(deadline - time.monotonic(), 0)
+        try:
+            line = lines.get(timeout=wait)
+        except queue.Empty:
+            self._kill()
+            return False
+        if not line:
+            # exited before answering, which _parse_line reports
+            self._parse_line(line, _READY_PROBE)
+        return True
+
+    @staticmethod
+    def _read_lines(stream, n_lines: int, lines: queue.Queue) -> None:
+        for _ in range(n_lines):
+            line = stream.readline()
+            lines.put(line)
+            if not line:
+                return
+
+    def _read_result(self, name: str) -> tuple:
+        """Read OPSIN's answer for the next name sent to it."""
+        return self._parse_line(self._process.stdout.readline(), name)
+
+    def _parse_line(self, line: bytes, name: str) -> tuple:
+        """(output, message) from one line of OPSIN's output, fetching any error message."""
+        if not line:
+            raise RuntimeError(
+                "OPSIN process exited unexpectedly with return code {}.".format(
+                    self._process.wait()
+                )
+            )
+        count("bytes_out", len(line))
+        output = line.decode("utf-8").rstrip("\r\n")
+        message = None
+        if not output:
+            try:
+                message = self._errors.get(timeout=_ERROR_WAIT)
+            except queue.Empty:
+                message = "{:s} could not be parsed.".format(name)
+        return output, message
+
+    def stream(self, names, max_pending: int):
+        """Lazily yield (name, (output, message)) for each name from any iterable.
+
+        A feeder thread pulls names from the iterable and writes them to OPSIN,
+        never getting more than max_pending names ahead of the caller, so
+        memory use does not depend on how many names there are.
+        """
+        with self._lock:
+            self.start()
+            while not self._errors.empty():
+                self._errors.get_nowait()
+
+            done = object()
+            in_flight = queue.Queue()
+            slots = threading.Semaphore(max_pending)
+            stop = threading.Event()
+            failure = []
+
+            def feed():
+                try:
+                    for name in names:
+                        while not slots.acquire(timeout=0.1):
+                            if stop.is_set():
+                                return
+                        if stop.is_set():
+                            return
+                        if name.strip():
+                            self._write(
+                                (
+                                    name.replace("\r", " ").replace("\n", " ") + "\n"
+                                ).encode("utf-8")
+                            )
+                            in_flight.put((name, True))
+                        else:
+                            in_flight.put((name, False))
+                except Exception as e:
+                    failure.append(e)
+                finally:
+                    in_flight.put(done)
+
+            feeder = threading.Thread(target=feed, daemon=True)
+            feeder.start()
+            finished = False
+            try:
+                while True:
+                    item = in_flight.get()
+                    if item is done:
+                        break
+                    name, sent = item
+                    if sent:
+                        result = self._read_result(name)
+                    else:
+                        result = ("", "Cannot parse an empty name.")
+                    slots.release()
+                    yield name, result
+                if failure:
+                    raise failure[0]
+                finished = True
+            finally:
+                stop.set()
+                if not finished:
+                    # abandoned part way through, so OPSIN is out of step
+                    self._kill()
+                feeder.join(timeout=1)
+
+    def _kill(self) -> None:
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+
+    def close(self) -> None:
+        """Shut OPSIN down by closing its input, killing it if it lingers."""
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self._kill()
+        finally:
+            self._process.stdout.close()
+            self._process.stderr.close()
@@ -0,0 +1,323 @@
+import asyncio
+import contextvars
+from collections import deque
+from typing import Union
+
+from ._core import (
+    _ERROR_WAIT,
+    build_arg_list,
+    enter_session,
+    exit_session,
+    finish_results,
+    is_opsin_message,
+)
+
+try:
+    # python < 3.8
+    from typing import Literal
+except ImportError:
+    from typing_extensions import Literal
+
+# async sessions entered with an 'async with' block in this task, most recent last
+_ACTIVE_ASYNC_SESSIONS = contextvars.ContextVar("py2opsin_async_sessions", default=())
+
+
+class _AsyncOpsinWorker:
+    """OPSIN process driven through asyncio pipes.
+
+    Names submitted within batch_window seconds of each other are written to
+    OPSIN together, and their callers wait for the write to drain before
+    waiting on OPSIN, so input never piles up in the pipe. Every name sent gets a future, resolved in order as OPSIN's
+    output lines are read back, so a caller which is cancelled or times out
+    simply stops waiting while its lines are still consumed and discarded.
+    """
+
+    def __init__(self, arg_list: list, batch_window: float):
+        self.arg_list = arg_list
+        self.batch_window = batch_window
+        self._process = None
+        self._starting = None
+        self._pending = deque()
+        self._batch = []
+        self._flush_handle = None
+        # resolved once the batch being collected has been written and drained
+        self._sent = None
+
+    def alive(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    async def start(self) -> None:
+        """Launch OPSIN if it is not already running."""
+        if self.alive():
+            return
+        # concurrent callers should all wait on the same launch
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._launch())
+        try:
+            await asyncio.shield(self._starting)
+        finally:
+            if self._starting is not None and self._starting.done():
+                self._starting = None
+
+    async def _launch(self) -> None:
+        self._process = await asyncio.create_subprocess_exec(
+            *self.arg_list,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        self._errors = asyncio.Queue()
+        self._drain_lock = asyncio.Lock()
+        asyncio.ensure_future(self._read_stderr(self._process, self._errors))
+        asyncio.ensure_future(self._read_stdout(self._process))
+
+    @staticmethod
+    async def _read_stderr(process, errors: asyncio.Queue) -> None:
+        async for line in process.stderr:
+            text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+            if is_opsin_message(text):
+                errors.put_nowait(text)
+
+    async def _read_stdout(self, process) -> None:
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                break
+            if not self._pending:
+                continue
+            name, future = self._pending.popleft()
+            output = line.decode("utf-8").rstrip("\r\n")
+            message = None
+            if not output:
+                try:
+                    message = await asyncio.wait_for(self._errors.get(), _ERROR_WAIT)
+                except asyncio.TimeoutError:
+                    message = "{:s} could not be parsed.".format(name)
+            if not future.done():
+                future.set_result((output, message))
+
+        # OPSIN has gone, so nothing still pending will ever be answered
+        returncode = await process.wait()
+        while self._pending:
+            _, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(
+                    RuntimeError(
+                        "OPSIN process exited unexpectedly with return code {}.".format(
+                            returncode
+                        )
+                    )
+                )
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        batch, self._batch = self._batch, []
+        sent, self._sent = self._sent, None
+        if not self.alive():
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("OPSIN process is not running."))
+            sent.set_result(None)
+            return
+        self._pending.extend(batch)
+        self._process.stdin.write(
+            "".join(
+                name.replace("\r", " ").replace("\n", " ") + "\n" for name, _ in batch
+            ).encode("utf-8")
+        )
+        asyncio.ensure_future(self._drain(self._process.stdin, sent))
+
+    async def _drain(self, stdin, sent: asyncio.Future) -> None:
+        try:
+            # one drain at a time, which older Pythons require
+            async with self._drain_lock:
+                await stdin.drain()
+        except ConnectionError:
+            # OPSIN has exited, which _read_stdout reports to every pending name
+            pass
+        finally:
+            sent.set_result(None)
+
+    async def convert(self, names: list) -> list:
+        """One (output, message) pair per name, message being None on success."""
+        await self.start()
+        loop = asyncio.get_running_loop()
+        if self._sent is None:
+            self._sent = loop.create_future()
+        sent = self._sent
+        futures = []
+        for name in names:
+            future = loop.create_future()
+            if name.strip():
+                self._batch.append((name, future))
+            else:
+                future.set_result(("", "Cannot parse an empty name."))
+            futures.append(future)
+        if self._batch and self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        try:
+            if self._batch:
+                await asyncio.shield(sent)
+            return await asyncio.gather(*futures)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    async def close(self) -> None:
+        """Shut OPSIN down by closing its input, killing it if it lingers."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush()
+        if not self.alive():
+            return
+        self._process.stdin.close()
+        try:
+            await asyncio.wait_for(self._process.wait(), 5)
+        except asyncio.TimeoutError:
+            self._process.kill()
+            await self._process.wait()
+
+
+class AsyncOpsinSession:
+    """asyncio counterpart to OpsinSession, for use inside event loops.
+
+    OPSIN is started once per combination of output format and flags and
+    driven through non-blocking pipes. Names from concurrent callers arriving
+    within batch_window seconds of each other are sent to OPSIN in a single
+    write. Used with 'async with', py2opsin_async() calls inside the block,
+    and in tasks started from it, share this session:
+
+        async with AsyncOpsinSession():
+            smiles = await py2opsin_async("ethane")
+
+    Args:
+        jar_fpath (str, optional): Filepath to OPSIN jar file. Defaults to "default", which causes py2opsin to use its included jar.
+        batch_window (float, optional): Seconds to collect names from concurrent callers before sending them. Defaults to 0.002.
+    """
+
+    def __init__(self, jar_fpath: str = "default", batch_window: float = 0.002):
+        self.jar_fpath = jar_fpath
+        self.batch_window = batch_window
+        self._workers = {}
+
+    def _worker(self, arg_list: list) -> _AsyncOpsinWorker:
+        key = tuple(arg_list)
+        if key not in self._workers:
+            self._workers[key] = _AsyncOpsinWorker(arg_list, self.batch_window)
+        return self._workers[key]
+
+    async def convert(
+        self,
+        chemical_name: Union[str, list],
+        output_format: Literal[
+            "SMILES",
+            "ExtendedSMILES",
+            "InChI",
+            "StdInChI",
+            "StdInChIKey",
+        ] = "SMILES",
+        allow_acid: bool = False,
+        allow_radicals: bool = False,
+        allow_bad_stereo: bool = False,
+        wildcard_radicals: bool = False,
+        timeout: float = None,
+        return_failures: bool = False,
+    ) -> Union[str, list]:
+        """Translate names with the running OPSIN, starting it if needed.
+
+        Args are the same as for py2opsin(), plus:
+            timeout (float, optional): Seconds to wait before raising asyncio.TimeoutError. Defaults to None (no limit).
+
+        Returns:
+            str: Species in requested format, or empty string if it could not be parsed. List of strings if input is list.
+        """
+        if output_format == "CML":
+            raise RuntimeError("CML output cannot be streamed, use py2opsin instead.")
+        worker = self._worker(
+            build_arg_list(
+                output_format,
+                allow_acid,
+                allow_radicals,
+                allow_bad_stereo,
+                wildcard_radicals,
+                self.jar_fpath,
+            )
+        )
+        if isinstance(chemical_name, str):
+            chemical_name = str(chemical_name)
+        names = [chemical_name] if type(chemical_name) is str else list(chemical_name)
+        results = await asyncio.wait_for(worker.convert(names), timeout)
+
+        outputs = finish_results(names, results, return_failures)
+        return outputs[0] if type(chemical_name) is str else outputs
+
+    async def close(self) -> None:
+        """Stop every OPSIN process this session started."""
+        workers, self._workers = list(self._workers.values()), {}
+        await asyncio.gather(*(worker.close() for worker in workers))
+
+    async def __aenter__(self):
+        enter_session(_ACTIVE_ASYNC_SESSIONS, self)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        exit_session(_ACTIVE_ASYNC_SESSIONS, self)
+        await self.close()
+
+
+async def py2opsin_async(
+    chemical_name: Union[str, list],
+    output_format: Literal[
+        "SMILES",
+        "ExtendedSMILES",
+        "InChI",
+        "StdInChI",
+        "StdInChIKey",
+    ] = "SMILES",
+    allow_acid: bool = False,
+    allow_radicals: bool = False,
+    allow_bad_stereo: bool = False,
+    wildcard_radicals: bool = False,
+    jar_fpath: str = "default",
+    timeout: float = None,
+    return_failures: bool = False,
+) -> Union[str, list]:
+    """Coroutine version of py2opsin which never blocks the event loop.
+
+    Inside an `async with AsyncOpsinSession():` block the session's running
+    OPSIN is used, otherwise OPSIN is started for this call alone.
+
+    Args are the same as for py2opsin(), plus:
+        timeout (float, optional): Seconds to wait before raising asyncio.TimeoutError. Defaults to None (no limit).
+
+    Returns:
+        str: Species in requested format, or empty string if it could not be parsed. List of strings if input is list.
+    """
+    for session in reversed(_ACTIVE_ASYNC_SESSIONS.get()):
+        if session.jar_fpath == jar_fpath:
+            return await session.convert(
+                chemical_name,
+                output_format,
+                allow_acid,
+                allow_radicals,
+                allow_bad_stereo,
+                wildcard_radicals,
+                timeout=timeout,
+                return_failures=return_failures,
+            )
+
+    session = AsyncOpsinSession(jar_fpath=jar_fpath)
+    try:
+        return await session.convert(
+            chemical_name,
+            output_format,
+            allow_acid,
+            allow_radicals,
+            allow_bad_stereo,
+            wildcard_radicals,
+            timeout=timeout,
+            return_failures=return_failures,
+        )
+    finally:
+        await session.close()
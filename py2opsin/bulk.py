@@ -0,0 +1,280 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from typing import NamedTuple
+
+from .session import OpsinSession
+
+try:
+    # python < 3.8
+    from typing import Literal
+except ImportError:
+    from typing_extensions import Literal
+
+
+class ConversionSummary(NamedTuple):
+    """Rows written and names which could not be parsed by convert_file()."""
+
+    rows: int
+    failures: int
+
+
+def _checkpoint_fpath(output_fpath: str) -> str:
+    return output_fpath + ".checkpoint"
+
+
+def _read_checkpoint(output_fpath: str, settings: dict):
+    """Saved progress for this conversion, or None if there is none."""
+    try:
+        with open(_checkpoint_fpath(output_fpath)) as file:
+            checkpoint = json.load(file)
+    except FileNotFoundError:
+        return None
+    if checkpoint["settings"] != settings:
+        raise RuntimeError(
+            "Checkpoint {:s} was written for a different conversion, delete it or run without resume.".format(
+                _checkpoint_fpath(output_fpath)
+            )
+        )
+    return checkpoint
+
+
+def _write_checkpoint(output_fpath: str, checkpoint: dict) -> None:
+    # write then rename, so an interruption never leaves half a checkpoint
+    tmp_fpath = _checkpoint_fpath(output_fpath) + ".tmp"
+    with open(tmp_fpath, "w") as file:
+        json.dump(checkpoint, file)
+    os.replace(tmp_fpath, _checkpoint_fpath(output_fpath))
+
+
+def _lines(file):
+    # readline rather than iteration, which would disable file.tell()
+    return iter(file.readline, "")
+
+
+def convert_file(
+    input_fpath: str,
+    output_fpath: str,
+    column: str = None,
+    output_format: Literal[
+        "SMILES",
+        "ExtendedSMILES",
+        "InChI",
+        "StdInChI",
+        "StdInChIKey",
+    ] = "SMILES",
+    allow_acid: bool = False,
+    allow_radicals: bool = False,
+    allow_bad_stereo: bool = False,
+    wildcard_radicals: bool = False,
+    jar_fpath: str = "default",
+    chunk_size: int = 10000,
+    n_workers: int = 1,
+    delimiter: str = ",",
+    resume: bool = False,
+) -> ConversionSummary:
+    """Translate every name in a file, writing each row back out with its result.
+
+    The input is read chunk_size rows at a time and streamed through OPSIN, so
+    memory use does not depend on the size of the file. After every chunk the
+    output is flushed and a checkpoint is saved beside it, which lets an
+    interrupted run be picked up where it left off with resume=True. The
+    checkpoint is removed once the whole file has been converted.
+
+    Args:
+        input_fpath (str): File of names, either one per line or delimited with a header row.
+        output_fpath (str): Delimited file to write. Each input row is copied with the result and OPSIN's error message
+                            (empty on success) appended. Plain name lists are written with a "name" column.
+        column (str, optional): Header of the column holding names. Defaults to None, meaning the input is one name per line.
+        output_format (str, optional): One of "SMILES", "ExtendedSMILES", "InChI", "StdInChI", or "StdInChIKey".
+                                        Defaults to "SMILES".
+        allow_acid (bool, optional): Allow interpretation of acids. Defaults to False.
+        allow_radicals (bool, optional): Enable radical interpretation. Defaults to False.
+        allow_bad_stereo (bool, optional): Allow OPSIN to ignore uninterpreatable stereochem. Defaults to False.
+        wildcard_radicals (bool, optional): Output radicals as wildcards. Defaults to False.
+        jar_fpath (str, optional): Filepath to OPSIN jar file. Defaults to "default", which causes py2opsin to use its included jar.
+        chunk_size (int, optional): Rows to read, convert, and write at a time. Defaults to 10000.
+        n_workers (int, optional): Number of OPSIN processes to split each chunk between. Defaults to 1.
+        delimiter (str, optional): Field delimiter of the input and output. Defaults to ",".
+        resume (bool, optional): Continue from the checkpoint left by an interrupted run, if there is one. Defaults to False.
+
+    Returns:
+        ConversionSummary: Total rows written and how many of them failed to parse.
+    """
+    if chunk_size < 1:
+        raise RuntimeError("chunk_size must be at least 1, got {}.".format(chunk_size))
+    options = (
+        output_format,
+        allow_acid,
+        allow_radicals,
+        allow_bad_stereo,
+        wildcard_radicals,
+    )
+    settings = {
+        "input": os.path.abspath(input_fpath),
+        "column": column,
+        "options": list(options),
+        "delimiter": delimiter,
+    }
+    checkpoint = _read_checkpoint(output_fpath, settings) if resume else None
+    if checkpoint is None:
+        checkpoint = {
+            "settings": settings,
+            "input_offset": None,
+            "output_offset": 0,
+            "rows": 0,
+            "failures": 0,
+        }
+
+    # not entered with 'with', which would hand it to py2opsin() calls elsewhere
+    session = OpsinSession(jar_fpath=jar_fpath, n_workers=n_workers)
+    try:
+        _convert_rows(
+            session,
+            input_fpath,
+            output_fpath,
+            column,
+            options,
+            delimiter,
+            chunk_size,
+            checkpoint,
+        )
+    finally:
+        session.close()
+
+    try:
+        os.remove(_checkpoint_fpath(output_fpath))
+    except FileNotFoundError:
+        pass
+    return ConversionSummary(checkpoint["rows"], checkpoint["failures"])
+
+
+def _convert_rows(
+    session: OpsinSession,
+    input_fpath: str,
+    output_fpath: str,
+    column: str,
+    options: tuple,
+    delimiter: str,
+    chunk_size: int,
+    checkpoint: dict,
+) -> None:
+    """Body of convert_file, updating checkpoint after every chunk written."""
+    with open(input_fpath, newline="") as infile:
+        # fail on bad options before anything is written
+        session.start(*options)
+
+        if column is None:
+            header = ["name"]
+            index = 0
+            rows = ([line.rstrip("\r\n")] for line in _lines(infile))
+        else:
+            reader = csv.reader(_lines(infile), delimiter=delimiter)
+            header = next(reader, [])
+            try:
+                index = header.index(column)
+            except ValueError:
+                raise RuntimeError(
+                    "Column {:s} not found in {:s}, which has columns {}.".format(
+                        column, input_fpath, header
+                    )
+                )
+            rows = reader
+
+        if checkpoint["input_offset"] is None:
+            outfile = open(output_fpath, "w", newline="")
+            csv.writer(outfile, delimiter=delimiter).writerow(
+                header + [options[0], "error"]
+            )
+        else:
+            infile.seek(checkpoint["input_offset"])
+            # drop anything written after the checkpoint was taken
+            outfile = open(output_fpath, "r+", newline="")
+            outfile.truncate(checkpoint["output_offset"])
+            outfile.seek(checkpoint["output_offset"])
+
+        with outfile:
+            writer = csv.writer(outfile, delimiter=delimiter)
+            while True:
+                chunk = []
+                for row in rows:
+                    chunk.append(row)
+                    if len(chunk) == chunk_size:
+                        break
+                if not chunk:
+                    break
+
+                names = [row[index] if index < len(row) else "" for row in chunk]
+                results = session._results(names, *options)
+                for row, (output, message) in zip(chunk, results):
+                    writer.writerow(row + [output, message or ""])
+                outfile.flush()
+
+                checkpoint["input_offset"] = infile.tell()
+                checkpoint["output_offset"] = outfile.tell()
+                checkpoint["rows"] += len(chunk)
+                checkpoint["failures"] += sum(
+                    message is not None for _, message in results
+                )
+                _write_checkpoint(output_fpath, checkpoint)
+
+
+def main(argv=None) -> int:
+    """Entry point for the py2opsin-convert command."""
+    parser = argparse.ArgumentParser(
+        description="Translate a file of IUPAC names with OPSIN, writing each row back out with its result."
+    )
+    parser.add_argument("input", help="file of names, one per line or delimited")
+    parser.add_argument("output", help="delimited file to write results to")
+    parser.add_argument(
+        "--column", help="header of the column holding names in a delimited input"
+    )
+    parser.add_argument(
+        "--format",
+        default="SMILES",
+        dest="output_format",
+        help="one of SMILES, ExtendedSMILES, InChI, StdInChI, or StdInChIKey",
+    )
+    parser.add_argument("--allow-acid", action="store_true")
+    parser.add_argument("--allow-radicals", action="store_true")
+    parser.add_argument("--allow-bad-stereo", action="store_true")
+    parser.add_argument("--wildcard-radicals", action="store_true")
+    parser.add_argument("--jar", default="default", help="OPSIN jar to use")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=1, help="OPSIN processes")
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue an interrupted run from its checkpoint",
+    )
+    args = parser.parse_args(argv)
+
+    summary = convert_file(
+        args.input,
+        args.output,
+        column=args.column,
+        output_format=args.output_format,
+        allow_acid=args.allow_acid,
+        allow_radicals=args.allow_radicals,
+        allow_bad_stereo=args.allow_bad_stereo,
+        wildcard_radicals=args.wildcard_radicals,
+        jar_fpath=args.jar,
+        chunk_size=args.chunk_size,
+        n_workers=args.workers,
+        delimiter=args.delimiter,
+        resume=args.resume,
+    )
+    print(
+        "Converted {:d} names to {:s} ({:d} could not be parsed).".format(
+            summary.rows, args.output, summary.failures
+        ),
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"]
+)
+
+
+class OpsinCache:
+    """Bounded in-memory cache of OPSIN results with least-recently-used eviction.
+
+    Pass an instance to py2opsin() with cache=... to skip OPSIN for names it has
+    already seen. Entries are keyed on the name together with the output format,
+    every flag, and the identity of the jar, so a change to any of them is a miss.
+    Failed names are cached too, along with OPSIN's message.
+
+    Args:
+        maxsize (int, optional): Most results to hold before evicting the least recently used. Defaults to 100000.
+    """
+
+    def __init__(self, maxsize: int = 100000):
+        if maxsize < 1:
+            raise RuntimeError("maxsize must be at least 1, got {}.".format(maxsize))
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+
+    def get_many(self, keys: list) -> dict:
+        """Cached (output, message) pairs for whichever of keys are present."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                try:
+                    found[key] = self._data[key]
+                except KeyError:
+                    self._misses += 1
+                    continue
+                self._data.move_to_end(key)
+                self._hits += 1
+        return found
+
+    def put_many(self, items: dict) -> None:
+        """Store (output, message) pairs, evicting the oldest entries if full."""
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def cache_info(self) -> CacheInfo:
+        """Hit, miss, and eviction counts along with the current size."""
+        with self._lock:
+            return CacheInfo(
+                self._hits,
+                self._misses,
+                self._evictions,
+                self.maxsize,
+                len(self._data),
+            )
+
+    def clear(self) -> None:
+        """Empty the cache and reset its statistics."""
+        with self._lock:
+            self._data.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+@functools.lru_cache(maxsize=None)
+def _jar_digest(jar_fpath: str, size: int, mtime_ns: int) -> str:
+    """SHA-256 of the jar, so identical jars share results wherever installed."""
+    if size is None:
+        return jar_fpath
+    sha = hashlib.sha256()
+    with open(jar_fpath, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class OpsinDiskCache:
+    """Persistent cache of OPSIN results in a SQLite database.
+
+    Drop-in alternative to OpsinCache for py2opsin(cache=...) which survives
+    between runs and can be shared by any number of processes at once. Jars are
+    identified by a hash of their contents, so upgrading OPSIN or changing any
+    flag never returns a stale result. Lookups and new results are each handled
+    in a single transaction per call. Once max_entries is exceeded the entries
+    which were least recently used are deleted. Lookups only read the database,
+    with the times entries were used written in batches alongside new results.
+
+    Args:
+        fpath (str): Filepath of the SQLite database, created if it does not exist.
+        max_entries (int, optional): Most results to keep on disk. Defaults to 10000000.
+        timeout (float, optional): Seconds to wait for another process to release the database. Defaults to 60.
+    """
+
+    # SQLite limits the number of parameters in a single statement
+    _BATCH = 500
+
+    # most hits to hold in memory before recording when they were used
+    _TOUCH_BATCH = 10000
+
+    def __init__(self, fpath: str, max_entries: int = 10000000, timeout: float = 60):
+        if max_entries < 1:
+            raise RuntimeError(
+                "max_entries must be at least 1, got {}.".format(max_entries)
+            )
+        self.fpath = os.path.abspath(fpath)
+        self.maxsize = max_entries
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+        self._touched = {}
+        db = self._connection()
+        # one transaction, so concurrent processes agree on the starting row count
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "name TEXT, options TEXT, jar TEXT, output TEXT, message TEXT, "
+                "last_used REAL, PRIMARY KEY (name, options, jar))"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)"
+            )
+            # running row count, so that checking for eviction never scans the table
+            db.execute("CREATE TABLE IF NOT EXISTS size (rows INTEGER)")
+            db.execute(
+                "INSERT INTO size SELECT COUNT(*) FROM results "
+                "WHERE NOT EXISTS (SELECT 1 FROM size)"
+            )
+            db.execute(
+                "CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results "
+                "BEGIN UPDATE size SET rows = rows + 1; END"
+            )
+            db.execute(
+                "CREATE TRIGGER IF NOT EXISTS results_delete AFTER DELETE ON results "
+                "BEGIN UPDATE size SET rows = rows - 1; END"
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _connection(self):
+        # connections cannot be shared between threads or forked processes
+        if getattr(self._local, "pid", None) != os.getpid():
+            # only imported here, as py2opsin imports this module for OpsinCache
+            import sqlite3
+
+            db = sqlite3.connect(self.fpath, timeout=self.timeout)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            # so rows replaced by INSERT OR REPLACE fire the delete trigger
+            db.execute("PRAGMA recursive_triggers=ON")
+            self._local.db, self._local.pid = db, os.getpid()
+        return self._local.db
+
+    @staticmethod
+    def _columns(key: tuple) -> tuple:
+        """Split a py2opsin cache key into (name, options, jar) columns."""
+        name, *options, jar = key
+        return name, "|".join(str(option) for option in options), _jar_digest(*jar)
+
+    def _groups(self, keys: list) -> dict:
+        groups = {}
+        for key in keys:
+            name, options, jar = self._columns(key)
+            groups.setdefault((options, jar), {})[name] = key
+        return groups
+
+    def get_many(self, keys: list) -> dict:
+        """Cached (output, message) pairs for whichever of keys are present."""
+        found = {}
+        touched = {}
+        now = time.time()
+        db = self._connection()
+        for (options, jar), by_name in self._groups(keys).items():
+            names = list(by_name)
+            for start in range(0, len(names), self._BATCH):
+                end = start + self._BATCH
+                batch = names[start:end]
+                rows = db.execute(
+                    "SELECT name, output, message FROM results "
+                    "WHERE options = ? AND jar = ? AND name IN ({})".format(
+                        ",".join("?" * len(batch))
+                    ),
+                    [options, jar] + batch,
+                ).fetchall()
+                for name, output, message in rows:
+                    found[by_name[name]] = (output, message)
+                    touched[(name, options, jar)] = now
+        with self._lock:
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+            self._touched.update(touched)
+            flush = len(self._touched) >= self._TOUCH_BATCH
+        if flush:
+            with db:
+                self._write_touched(db)
+        return found
+
+    def _write_touched(self, db) -> None:
+        """Record when the hits held in memory were used, inside the caller's transaction."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        db.executemany(
+            "UPDATE results SET last_used = ? "
+            "WHERE name = ? AND options = ? AND jar = ? AND last_used < ?",
+            [(used, *columns, used) for columns, used in touched.items()],
+        )
+
+    def put_many(self, items: dict) -> None:
+        """Store (output, message) pairs, evicting the oldest entries if full."""
+        now = time.time()
+        db = self._connection()
+        with db:
+            self._write_touched(db)
+            db.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    self._columns(key) + (output, message, now)
+                    for key, (output, message) in items.items()
+                ],
+            )
+            excess = db.execute("SELECT rows FROM size").fetchone()[0] - self.maxsize
+            if excess > 0:
+                db.execute(
+                    "DELETE FROM results WHERE rowid IN "
+                    "(SELECT rowid FROM results ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+        if excess > 0:
+            with self._lock:
+                self._evictions += excess
+
+    def cache_info(self) -> CacheInfo:
+        """Hit, miss, and eviction counts for this process along with the current size."""
+        currsize = self._connection().execute("SELECT rows FROM size").fetchone()[0]
+        with self._lock:
+            return CacheInfo(
+                self._hits, self._misses, self._evictions, self.maxsize, currsize
+            )
+
+    def clear(self) -> None:
+        """Delete every stored result and reset the statistics."""
+        db = self._connection()
+        with db:
+            db.execute("DELETE FROM results")
+        with self._lock:
+            self._hits = self._misses = self._evictions = 0
+            self._touched = {}
+
+    def __len__(self):
+        return self.cache_info().currsize
@@ -0,0 +1,96 @@
+def is_column(chemical_name) -> bool:
+    """True for pandas and NumPy inputs, which are converted by convert_column().
+
+    Only objects with at least one dimension (Series, Index, ndarray) count,
+    not NumPy scalars such as numpy.str_.
+    """
+    if type(chemical_name).__module__.split(".")[0] not in ("pandas", "numpy"):
+        return False
+    return getattr(chemical_name, "ndim", 0) >= 1
+
+
+def _is_null(value) -> bool:
+    if value is None:
+        return True
+    try:
+        # NaN and NaT are the only values not equal to themselves
+        return bool(value != value)
+    except TypeError:
+        # pandas.NA refuses to be converted to bool
+        return True
+
+
+def convert_column(chemical_name, output_format, py2opsin_kwargs: dict):
+    """py2opsin for a pandas Series or NumPy array, aligned to the input.
+
+    Null entries (None, NaN, NaT, or pandas.NA) are skipped and give None, and
+    each distinct name is only sent to OPSIN once.
+
+    Args:
+        chemical_name (pandas.Series, numpy.ndarray): Names to convert.
+        output_format (str, list): Output format, or list of them.
+        py2opsin_kwargs (dict): Every other argument to pass on to py2opsin().
+
+    Returns:
+        Series with the same index as the input (a DataFrame with one column per format if output_format is a list),
+        or for any other input a NumPy object array (a dict of format to array if output_format is a list).
+        False if OPSIN failed.
+    """
+    from .py2opsin import py2opsin
+
+    if type(chemical_name).__name__ == "DataFrame":
+        raise RuntimeError(
+            "Pass a single column of names to py2opsin, e.g. df['name'], not a whole DataFrame."
+        )
+    multiple = not isinstance(output_format, str)
+    if output_format == "CML" or (multiple and "CML" in output_format):
+        raise RuntimeError("CML output cannot be aligned to a column of names.")
+
+    values = (
+        chemical_name.tolist()
+        if hasattr(chemical_name, "tolist")
+        else list(chemical_name)
+    )
+    if any(isinstance(value, list) for value in values):
+        raise RuntimeError("Names must be in a one dimensional Series or array.")
+    names = [None if _is_null(value) else str(value) for value in values]
+    unique = list(dict.fromkeys(name for name in names if name is not None))
+    results = py2opsin(unique, output_format, **py2opsin_kwargs) if unique else []
+    if results is False:
+        return False
+
+    if multiple:
+        formats = list(dict.fromkeys(output_format))
+        by_name = {
+            format: dict(zip(unique, (record[format] for record in results)))
+            for format in formats
+        }
+        columns = {
+            format: [None if name is None else found[name] for name in names]
+            for format, found in by_name.items()
+        }
+    else:
+        found = dict(zip(unique, results))
+        column = [None if name is None else found[name] for name in names]
+
+    if type(chemical_name).__name__ == "Series":
+        import pandas as pd
+
+        if multiple:
+            return pd.DataFrame(columns, index=chemical_name.index)
+        return pd.Series(
+            column, index=chemical_name.index, name=output_format, dtype=object
+        )
+
+    import numpy as np
+
+    def to_array(items: list):
+        # filled one by one so tuples (i.e. ParseFailure) stay single elements
+        array = np.empty(len(items), dtype=object)
+        for i, item in enumerate(items):
+            array[i] = item
+        return array
+
+    if multiple:
+        return {format: to_array(items) for format, items in columns.items()}
+    return to_array(column)
@@ -0,0 +1,302 @@
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from typing import Union
+
+from ._core import TimeoutMessage, UnpairedMessage, resolve_jar
+from .session import OpsinSession
+from .stats import stage
+
+# TCP port used when an address is given as just a host
+DEFAULT_PORT = 52186
+
+# seconds to wait for a daemon to accept a connection before converting locally
+CONNECT_TIMEOUT = 1.0
+
+
+def default_address() -> Union[str, None]:
+    """Address py2opsin() looks for a daemon at, or None if it should not look.
+
+    The PY2OPSIN_DAEMON environment variable takes precedence, either a Unix
+    socket path or "host:port", and an empty value turns the daemon off.
+    Otherwise a Unix socket in py2opsin's cache directory is used where Unix
+    sockets are available.
+    """
+    if "PY2OPSIN_DAEMON" in os.environ:
+        return os.environ["PY2OPSIN_DAEMON"] or None
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    cache_dir = os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "py2opsin"
+    )
+    return os.path.join(cache_dir, "daemon.sock")
+
+
+def _parse_address(address: str) -> tuple:
+    """Socket family and address for a Unix socket path or "host:port"."""
+    host, _, port = address.rpartition(":")
+    if port.isdigit() and os.sep not in address:
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    if not hasattr(socket, "AF_UNIX"):
+        return socket.AF_INET, (address, DEFAULT_PORT)
+    return socket.AF_UNIX, address
+
+
+def _jar_key(jar_fpath: str) -> str:
+    return os.path.abspath(resolve_jar(jar_fpath))
+
+
+def daemon_results(
+    names: list,
+    options: tuple,
+    jar_fpath: str,
+    timeouts: tuple = (None, None),
+) -> Union[list, None]:
+    """(output, message) pairs from a running daemon, or None if there is none to ask.
+
+    None is also returned if the daemon goes away mid-request or cannot serve
+    the jar, so the caller can convert the names itself instead.
+
+    Raises:
+        RuntimeError: The daemon's OPSIN failed on these names.
+    """
+    address = default_address()
+    if address is None:
+        return None
+    family, sock_address = _parse_address(address)
+    if family != socket.AF_INET and not os.path.exists(sock_address):
+        return None
+
+    request = {
+        "names": names,
+        "options": list(options),
+        "jar": _jar_key(jar_fpath),
+        "timeout": timeouts[0],
+        "name_timeout": timeouts[1],
+    }
+    with stage("daemon"):
+        try:
+            with socket.socket(family, socket.SOCK_STREAM) as sock:
+                sock.settimeout(CONNECT_TIMEOUT)
+                sock.connect(sock_address)
+                sock.settimeout(None)
+                with sock.makefile("rwb") as stream:
+                    stream.write(json.dumps(request).encode("utf-8") + b"\n")
+                    stream.flush()
+                    line = stream.readline()
+        except OSError:
+            return None
+    if not line:
+        return None
+    response = json.loads(line.decode("utf-8"))
+    if "error" in response:
+        raise RuntimeError("py2opsin daemon failed: " + response["error"])
+    if "results" not in response:
+        return None
+    return [_message_pair(*result) for result in response["results"]]
+
+
+def _message_pair(output: str, message: str, timed_out: bool, err_str: str = None):
+    """(output, message) pair from one result sent by the daemon, restoring the message's type."""
+    if timed_out:
+        return output, TimeoutMessage(message)
+    if err_str is not None:
+        return output, UnpairedMessage(message, err_str)
+    return output, message
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            response = self.server.daemon._respond(json.loads(line.decode("utf-8")))
+        except Exception as e:
+            response = {"error": repr(e)}
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class OpsinDaemon:
+    """Serve conversions from one set of warm OPSIN processes to any local process.
+
+    Every call to py2opsin() on this host checks for a daemon (see
+    default_address) and, if one answers for the same jar, has it convert
+    the names rather than starting Java itself. If no daemon is reachable,
+    py2opsin() launches OPSIN as usual, so running one is never required.
+
+    Requests are one line of JSON over a Unix socket, which only the user
+    running the daemon may connect to, or over TCP on localhost. OPSIN runs
+    with the daemon's Java and JVM options, not the caller's.
+
+        with OpsinDaemon() as daemon:
+            daemon.serve_forever()
+
+    Args:
+        address (str, optional): Unix socket path or "host:port" to listen on. Defaults to default_address().
+        jar_fpath (str, optional): Filepath to OPSIN jar file. Defaults to "default", which causes py2opsin to use its included jar.
+        n_workers (int, optional): Number of OPSIN processes to run per combination of options. Defaults to 1.
+    """
+
+    def __init__(
+        self, address: str = None, jar_fpath: str = "default", n_workers: int = 1
+    ):
+        address = address or default_address()
+        if address is None:
+            raise RuntimeError(
+                "Unix sockets are not available, give the daemon a 'host:port' address."
+            )
+        self.address = address
+        self.jar_fpath = jar_fpath
+        self.session = OpsinSession(jar_fpath=jar_fpath, n_workers=n_workers)
+        self._server = None
+        self._thread = None
+
+    def _respond(self, request: dict) -> dict:
+        if request.get("jar") != _jar_key(self.jar_fpath):
+            return {"unsupported": "this daemon runs a different jar"}
+        results = self.session._results(
+            request["names"],
+            *request["options"],
+            timeout=request.get("timeout"),
+            name_timeout=request.get("name_timeout"),
+        )
+        return {
+            "results": [
+                [
+                    output,
+                    message,
+                    isinstance(message, TimeoutMessage),
+                    getattr(message, "err_str", None),
+                ]
+                for output, message in results
+            ]
+        }
+
+    def _bind(self) -> None:
+        if self._server is not None:
+            return
+        family, sock_address = _parse_address(self.address)
+        if family == socket.AF_INET:
+            server = socketserver.ThreadingTCPServer(
+                sock_address, _Handler, bind_and_activate=False
+            )
+            server.allow_reuse_address = True
+            server.server_bind()
+            server.server_activate()
+        else:
+            if os.path.exists(sock_address):
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    try:
+                        sock.connect(sock_address)
+                    except OSError:
+                        # left behind by a daemon which did not shut down cleanly
+                        os.remove(sock_address)
+                    else:
+                        raise RuntimeError(
+                            "A daemon is already listening on {:s}.".format(
+                                sock_address
+                            )
+                        )
+            os.makedirs(os.path.dirname(sock_address) or ".", exist_ok=True)
+            server = socketserver.ThreadingUnixStreamServer(sock_address, _Handler)
+            os.chmod(sock_address, 0o600)
+        server.daemon_threads = True
+        server.daemon = self
+        self._server = server
+
+    def start(self) -> None:
+        """Listen for requests on a background thread."""
+        self._bind()
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever, daemon=True
+            )
+            self._thread.start()
+
+    def serve_forever(self) -> None:
+        """Listen for requests until close() is called or the process is interrupted."""
+        self._bind()
+        self._server.serve_forever()
+
+    def close(self) -> None:
+        """Stop listening and stop every OPSIN process."""
+        server, self._server = self._server, None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            if server.address_family != socket.AF_INET:
+                try:
+                    os.remove(server.server_address)
+                except OSError:
+                    pass
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main(argv=None) -> int:
+    """Entry point for the py2opsin-daemon command."""
+    parser = argparse.ArgumentParser(
+        description="Keep OPSIN running and serve conversions to py2opsin in other processes."
+    )
+    parser.add_argument(
+        "--address",
+        help="Unix socket path or host:port to listen on (default: $PY2OPSIN_DAEMON or a socket in ~/.cache/py2opsin)",
+    )
+    parser.add_argument("--jar", default="default", help="OPSIN jar to use")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="OPSIN processes per set of options"
+    )
+    parser.add_argument(
+        "--no-warm",
+        action="store_true",
+        help="listen straight away rather than once OPSIN is warmed up",
+    )
+    parser.add_argument(
+        "--warm-up-corpus",
+        help="file of names, one per line, to warm OPSIN up with (default: a list shipped with py2opsin)",
+    )
+    args = parser.parse_args(argv)
+
+    daemon = OpsinDaemon(args.address, jar_fpath=args.jar, n_workers=args.workers)
+    # stop cleanly, removing the socket, when asked to by a service manager
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    with daemon:
+        if not args.no_warm:
+            # the socket only appears once warm, so callers never see a cold OPSIN
+            names = None
+            if args.warm_up_corpus:
+                with open(args.warm_up_corpus, "r", encoding="utf-8") as file:
+                    names = [line.rstrip("\r\n") for line in file if line.strip()]
+            report = daemon.session.warm_up(names)
+            print(
+                "OPSIN warmed up with {:d} names in {:.1f} seconds, now {:.0f} names/second.".format(
+                    report.names, report.seconds, report.rate
+                ),
+                file=sys.stderr,
+            )
+        print(
+            "py2opsin daemon listening on {:s}".format(daemon.address), file=sys.stderr
+        )
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Union
+
+from ._core import jar_identity
+from .cache import CacheInfo, OpsinCache, OpsinDiskCache, _jar_digest
+from .results import ParseFailure
+
+MAGIC = b"P2OINDEX"
+# bumped whenever the layout below changes, so old files are refused rather than misread
+VERSION = 1
+# magic, then version, number of entries, and length of the JSON metadata
+_HEADER = struct.Struct("<8sIII")
+
+DEFAULT_FORMATS = ("SMILES", "StdInChI", "StdInChIKey")
+
+
+def _hash(encoded: bytes) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(encoded, digest_size=8).digest(), sys.byteorder
+    )
+
+
+class OpsinIndex:
+    """Read-only table of names already converted by OPSIN, memory-mapped from disk.
+
+    The index is built ahead of time by build_index() (or the py2opsin-index
+    command) for one jar and set of flags, and holds every requested format
+    for each name. Pass it to py2opsin() like a cache, and names found in it
+    are answered without starting Java:
+
+        index = OpsinIndex("common_names.idx")
+        py2opsin(names, cache=index)
+
+    Lookups binary search a sorted table of name hashes straight from the
+    memory map, so opening an index reads almost nothing and every process
+    using the same file shares one copy in the page cache. Names for another
+    jar, other flags, or a format the index lacks are treated as misses.
+
+    Args:
+        fpath (str): Filepath of the index.
+        cache (OpsinCache or OpsinDiskCache, optional): Cache to consult for names missing from the index, and to store
+                                                        new results in. Defaults to None.
+    """
+
+    def __init__(self, fpath: str, cache: Union[OpsinCache, OpsinDiskCache] = None):
+        self.fpath = os.path.abspath(fpath)
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._hits = self._misses = 0
+        with open(self.fpath, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, n, meta_len = _HEADER.unpack_from(self._mmap)
+        except struct.error:
+            magic, version = None, None
+        if magic != MAGIC:
+            self._mmap.close()
+            raise RuntimeError("{:s} is not a py2opsin index.".format(self.fpath))
+        meta_start = _HEADER.size
+        meta_end = meta_start + meta_len
+        meta = json.loads(self._mmap[meta_start:meta_end].decode("utf-8"))
+        if version != VERSION or meta["byteorder"] != sys.byteorder:
+            self._mmap.close()
+            raise RuntimeError(
+                "{:s} was built for a different version of py2opsin or platform, rebuild it with build_index().".format(
+                    self.fpath
+                )
+            )
+        self.formats = tuple(meta["formats"])
+        self.flags = tuple(meta["flags"])
+        self.jar = meta["jar"]
+        self._n = n
+        # the hash and offset tables start on an 8 byte boundary after the metadata
+        table = meta_end + -meta_end % 8
+        offsets = table + 8 * n
+        data_start = offsets + 8 * (n + 1)
+        view = memoryview(self._mmap)
+        self._hashes = view[table:offsets].cast("Q")
+        self._offsets = view[offsets:data_start].cast("Q")
+        self._data_start = data_start
+
+    def _record(self, i: int) -> list:
+        start = self._data_start + self._offsets[i]
+        end = self._data_start + self._offsets[i + 1]
+        return self._mmap[start:end].split(b"\0")
+
+    def lookup(self, name: str) -> Union[dict, None]:
+        """Every format held for name, or None if it is not in the index."""
+        encoded = name.encode("utf-8")
+        key = _hash(encoded)
+        i = bisect_left(self._hashes, key)
+        while i < self._n and self._hashes[i] == key:
+            record = self._record(i)
+            if record[0] == encoded:
+                return dict(
+                    zip(self.formats, (value.decode("utf-8") for value in record[1:]))
+                )
+            i += 1
+        return None
+
+    def _serves(self, key: tuple) -> bool:
+        _, output_format, *flags, jar = key
+        if output_format not in self.formats or tuple(flags) != self.flags:
+            return False
+        return _jar_digest(*jar) == self.jar
+
+    def get_many(self, keys: list) -> dict:
+        """(output, message) pairs for whichever of keys are in the index, or else the cache."""
+        found = {}
+        for key in keys:
+            if self._serves(key):
+                values = self.lookup(key[0])
+                if values is not None:
+                    found[key] = (values[key[1]], None)
+        with self._lock:
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+        if self.cache is not None and len(found) < len(keys):
+            found.update(self.cache.get_many([key for key in keys if key not in found]))
+        return found
+
+    def put_many(self, items: dict) -> None:
+        """Store new results in the cache, if there is one. The index itself is never changed."""
+        if self.cache is not None:
+            self.cache.put_many(items)
+
+    def cache_info(self) -> CacheInfo:
+        """Hits and misses on the index itself, with its size."""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, 0, self._n, self._n)
+
+    def items(self):
+        """(name, dict of format to result) for every entry, in index order."""
+        for i in range(self._n):
+            record = self._record(i)
+            yield record[0].decode("utf-8"), dict(
+                zip(self.formats, (value.decode("utf-8") for value in record[1:]))
+            )
+
+    def close(self) -> None:
+        """Release the memory map."""
+        if self._mmap.closed:
+            return
+        # views into the map must be released before it can close
+        self._hashes.release()
+        self._offsets.release()
+        self._mmap.close()
+
+    def __len__(self):
+        return self._n
+
+    def __contains__(self, name: str):
+        return self.lookup(name) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _write_index(index_fpath: str, entries: dict, meta: dict) -> None:
+    """Write entries of name to list of results sorted by hash, replacing the file at once."""
+    encoded = sorted(
+        (_hash(name.encode("utf-8")), name.encode("utf-8"), values)
+        for name, values in entries.items()
+    )
+    hashes = array("Q", (key for key, _, _ in encoded))
+    offsets = array("Q", [0])
+    records = []
+    for _, name, values in encoded:
+        record = b"\0".join([name] + [value.encode("utf-8") for value in values])
+        records.append(record)
+        offsets.append(offsets[-1] + len(record))
+    meta = json.dumps(dict(meta, byteorder=sys.byteorder)).encode("utf-8")
+    header = _HEADER.pack(MAGIC, VERSION, len(encoded), len(meta)) + meta
+    header += b"\0" * (-len(header) % 8)
+
+    tmp_fpath = "{:s}.{:d}.tmp".format(index_fpath, os.getpid())
+    with open(tmp_fpath, "wb") as file:
+        file.write(header)
+        hashes.tofile(file)
+        offsets.tofile(file)
+        file.write(b"".join(records))
+    # readers keep the old file mapped until they reopen, so swap rather than overwrite
+    os.replace(tmp_fpath, index_fpath)
+
+
+def build_index(
+    chemical_names: Iterable[str],
+    index_fpath: str,
+    output_formats: list = DEFAULT_FORMATS,
+    allow_acid: bool = False,
+    allow_radicals: bool = False,
+    allow_bad_stereo: bool = False,
+    wildcard_radicals: bool = False,
+    jar_fpath: str = "default",
+    extend: bool = False,
+    chunk_size: int = 100000,
+) -> int:
+    """Convert a corpus of names with OPSIN and write them to an index for OpsinIndex.
+
+    Only names OPSIN parses in every format are kept. With extend, the
+    entries already in index_fpath are kept and only new names are converted,
+    in which case the existing index must have the same jar, flags, and formats.
+
+    Args:
+        chemical_names (iterable): Names to put in the index, e.g. an open file with one name per line.
+        index_fpath (str): Filepath to write the index to.
+        output_formats (list, optional): Formats to hold for each name. Defaults to SMILES, StdInChI, and StdInChIKey.
+        allow_acid (bool, optional): Allow interpretation of acids. Defaults to False.
+        allow_radicals (bool, optional): Enable radical interpretation. Defaults to False.
+        allow_bad_stereo (bool, optional): Allow OPSIN to ignore uninterpreatable stereochem. Defaults to False.
+        wildcard_radicals (bool, optional): Output radicals as wildcards. Defaults to False.
+        jar_fpath (str, optional): Filepath to OPSIN jar file. Defaults to "default", which causes py2opsin to use its included jar.
+        extend (bool, optional): Add to an existing index rather than replacing it. Defaults to False.
+        chunk_size (int, optional): Names to convert at once. Defaults to 100000.
+
+    Returns:
+        int: Number of names in the index.
+    """
+    from .py2opsin import py2opsin
+
+    output_formats = list(dict.fromkeys(output_formats))
+    if "CML" in output_formats:
+        raise RuntimeError("CML output cannot be held in an index.")
+    flags = [allow_acid, allow_radicals, allow_bad_stereo, wildcard_radicals]
+    meta = {
+        "formats": output_formats,
+        "flags": flags,
+        "jar": _jar_digest(*jar_identity(jar_fpath)),
+        "jar_name": os.path.basename(jar_identity(jar_fpath)[0]),
+    }
+
+    entries = {}
+    if extend and os.path.exists(index_fpath):
+        with OpsinIndex(index_fpath) as existing:
+            settings = (list(existing.formats), list(existing.flags), existing.jar)
+            if settings != (output_formats, flags, meta["jar"]):
+                raise RuntimeError(
+                    "{:s} was built with a different jar, flags, or formats, so it cannot be extended.".format(
+                        index_fpath
+                    )
+                )
+            for name, values in existing.items():
+                entries[name] = [values[format] for format in output_formats]
+
+    names = []
+    for name in chemical_names:
+        name = name.rstrip("\r\n")
+        # the index separates fields with null bytes
+        if name.strip() and "\0" not in name and name not in entries:
+            names.append(name)
+    names = list(dict.fromkeys(names))
+
+    for start in range(0, len(names), chunk_size):
+        end = start + chunk_size
+        chunk = names[start:end]
+        results = py2opsin(
+            chunk,
+            output_formats,
+            *flags,
+            jar_fpath=jar_fpath,
+            return_failures=True,
+        )
+        if results is False:
+            raise RuntimeError("OPSIN failed while building the index.")
+        for name, record in zip(chunk, results):
+            values = [record[format] for format in output_formats]
+            if all(value and not isinstance(value, ParseFailure) for value in values):
+                entries[name] = values
+
+    _write_index(index_fpath, entries, meta)
+    return len(entries)
+
+
+def main(argv=None) -> int:
+    """Entry point for the py2opsin-index command."""
+    parser = argparse.ArgumentParser(
+        description="Build an index of names converted by OPSIN, for py2opsin to look up without starting Java."
+    )
+    parser.add_argument("index", help="index file to write")
+    parser.add_argument("corpus", nargs="+", help="files of names, one per line")
+    parser.add_argument(
+        "--format",
+        action="append",
+        dest="output_formats",
+        help="format to hold, may be repeated (default: SMILES, StdInChI, and StdInChIKey)",
+    )
+    parser.add_argument("--allow-acid", action="store_true")
+    parser.add_argument("--allow-radicals", action="store_true")
+    parser.add_argument("--allow-bad-stereo", action="store_true")
+    parser.add_argument("--wildcard-radicals", action="store_true")
+    parser.add_argument("--jar", default="default", help="OPSIN jar to use")
+    parser.add_argument(
+        "--extend", action="store_true", help="add to the index rather than replace it"
+    )
+    args = parser.parse_args(argv)
+
+    def names():
+        for corpus_fpath in args.corpus:
+            with open(corpus_fpath, "r", encoding="utf-8") as file:
+                yield from file
+
+    n = build_index(
+        names(),
+        args.index,
+        output_formats=args.output_formats or DEFAULT_FORMATS,
+        allow_acid=args.allow_acid,
+        allow_radicals=args.allow_radicals,
+        allow_bad_stereo=args.allow_bad_stereo,
+        wildcard_radicals=args.wildcard_radicals,
+        jar_fpath=args.jar,
+        extend=args.extend,
+    )
+    print("Wrote {:d} names to {:s}.".format(n, args.index), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
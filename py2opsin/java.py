@@ -0,0 +1,189 @@
+import functools
+import hashlib
+import os
+import shlex
+import shutil
+import subprocess
+import warnings
+
+# executable chosen with set_java, which takes precedence over the environment
+_JAVA_FPATH = None
+
+# options chosen with set_jvm_options, which take precedence over the environment
+_JVM_OPTIONS = None
+
+# class data sharing archive chosen with use_cds_archive
+_CDS_ARCHIVE = None
+
+
+def set_java(java_fpath: str = None) -> None:
+    """Use a specific Java executable for every OPSIN launched from now on.
+
+    Args:
+        java_fpath (str, optional): Path to the java executable. Defaults to None, which goes back to searching for one.
+    """
+    global _JAVA_FPATH
+    _JAVA_FPATH = java_fpath
+    find_java.cache_clear()
+    check_java.cache_clear()
+
+
+@functools.lru_cache(maxsize=None)
+def find_java() -> str:
+    """Locate the Java executable without running it, caching the answer.
+
+    Looks in order at set_java(), the PY2OPSIN_JAVA environment variable,
+    $JAVA_HOME/bin, and finally the PATH. Warns (once) if none has Java.
+
+    Returns:
+        str: Path to the java executable, or "java" if it could not be found.
+    """
+    if _JAVA_FPATH is not None:
+        return _JAVA_FPATH
+    if os.environ.get("PY2OPSIN_JAVA"):
+        return os.environ["PY2OPSIN_JAVA"]
+    if os.environ.get("JAVA_HOME"):
+        java_fpath = shutil.which(os.path.join(os.environ["JAVA_HOME"], "bin", "java"))
+        if java_fpath is not None:
+            return java_fpath
+    java_fpath = shutil.which("java")
+    if java_fpath is None:
+        warnings.warn(
+            "Java could not be found on the PATH or in JAVA_HOME. "
+            "Java 8 or newer is required to use py2opsin, see help(py2opsin.set_java).",
+            category=RuntimeWarning,
+        )
+        return "java"
+    return java_fpath
+
+
+@functools.lru_cache(maxsize=None)
+def check_java() -> str:
+    """Make sure Java can actually be run, e.g. as a startup health check.
+
+    The result is cached, so only the first call launches a JVM.
+
+    Returns:
+        str: The version reported by `java -version`.
+
+    Raises:
+        RuntimeError: Java could not be run.
+    """
+    java_fpath = find_java()
+    try:
+        result = subprocess.run(
+            [java_fpath, "-version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+    except Exception as e:
+        raise RuntimeError(
+            "Java may not be installed/accessible ({:s} -version raised exception). "
+            "Java 8 or newer is required to use py2opsin. Original Error:\n{!r}".format(
+                java_fpath, e
+            )
+        )
+    # java prints its version to stderr
+    output = (result.stderr or result.stdout).decode("utf-8", errors="replace")
+    return output.strip().splitlines()[0] if output.strip() else ""
+
+
+def set_jvm_options(options: list = None) -> None:
+    """Pass extra options to the JVM of every OPSIN launched from now on.
+
+    For example ["-Xmx4g", "-XX:+UseParallelGC"] for a large heap and a
+    throughput oriented garbage collector, or ["-XX:TieredStopAtLevel=1"]
+    to start faster when converting only a few names at a time.
+
+    Args:
+        options (list, optional): JVM command line options. Defaults to None, which goes back to the
+                                  PY2OPSIN_JVM_OPTIONS environment variable (split like a shell command).
+    """
+    global _JVM_OPTIONS
+    _JVM_OPTIONS = None if options is None else [str(option) for option in options]
+
+
+def jvm_options(cds: bool = True) -> list:
+    """Options placed before -jar whenever OPSIN is launched.
+
+    Args:
+        cds (bool, optional): Include the class data sharing archive, if one is in use. Defaults to True.
+    """
+    if _JVM_OPTIONS is not None:
+        options = list(_JVM_OPTIONS)
+    else:
+        options = shlex.split(os.environ.get("PY2OPSIN_JVM_OPTIONS", ""))
+    if cds and _CDS_ARCHIVE is not None:
+        options.append("-XX:SharedArchiveFile=" + _CDS_ARCHIVE)
+    return options
+
+
+def _default_cds_fpath(jar_fpath: str) -> str:
+    """Archive path unique to this jar and Java, since archives only work with both."""
+    from ._core import jar_identity
+
+    key = repr((find_java(), check_java(), jar_identity(jar_fpath)))
+    cache_dir = os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "py2opsin"
+    )
+    return os.path.join(
+        cache_dir,
+        "opsin-{:s}.jsa".format(hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]),
+    )
+
+
+def use_cds_archive(
+    archive_fpath: str = None, jar_fpath: str = "default", rebuild: bool = False
+) -> str:
+    """Start OPSIN from a class data sharing archive, creating it if needed.
+
+    The archive holds OPSIN's classes already loaded and verified, which
+    noticeably cuts the time taken to launch OPSIN. It is built by running
+    OPSIN once on a few names and is only valid for the Java and jar it was
+    built with. Requires Java 13 or newer.
+
+    Args:
+        archive_fpath (str, optional): Where to keep the archive. Defaults to None, which uses a file in
+                                       ~/.cache/py2opsin named after the Java and jar in use.
+        jar_fpath (str, optional): Filepath to OPSIN jar file. Defaults to "default", which causes py2opsin to use its included jar.
+        rebuild (bool, optional): Build the archive again even if it already exists. Defaults to False.
+
+    Returns:
+        str: Path to the archive in use.
+
+    Raises:
+        RuntimeError: The archive could not be built, e.g. because Java is older than 13.
+    """
+    from ._core import resolve_jar
+
+    global _CDS_ARCHIVE
+    if archive_fpath is None:
+        archive_fpath = _default_cds_fpath(jar_fpath)
+    archive_fpath = os.path.abspath(archive_fpath)
+    if rebuild or not os.path.exists(archive_fpath):
+        os.makedirs(os.path.dirname(archive_fpath), exist_ok=True)
+        _CDS_ARCHIVE = None
+        args = [find_java(), *jvm_options()]
+        args += ["-XX:ArchiveClassesAtExit=" + archive_fpath]
+        args += ["-jar", resolve_jar(jar_fpath), "-osmi"]
+        result = subprocess.run(
+            args,
+            # exercise the parser so the classes it needs are archived
+            input=b"ethane\n2-chloro-4-nitrobenzoic acid\n(2S)-2-aminopropanoic acid\n",
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        if result.returncode or not os.path.exists(archive_fpath):
+            raise RuntimeError(
+                "Class data sharing archive could not be created (Java 13 or newer is required). "
+                "Java reported:\n" + result.stderr.decode("utf-8", errors="replace")
+            )
+    _CDS_ARCHIVE = archive_fpath
+    return archive_fpath
+
+
+def stop_cds_archive() -> None:
+    """Launch OPSIN without the archive chosen with use_cds_archive()."""
+    global _CDS_ARCHIVE
+    _CDS_ARCHIVE = None
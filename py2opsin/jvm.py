@@ -0,0 +1,247 @@
+import threading
+from contextlib import contextmanager
+
+from ._core import OUTPUT_FLAGS, resolve_jar
+from .java import jvm_options
+from .session import OpsinSession
+from .stats import stage
+
+# jar loaded into this process's JVM, which cannot be changed once started
+_JVM_JAR = None
+_JVM_LOCK = threading.Lock()
+
+
+class _Opsin:
+    """Handles on the OPSIN classes inside a running JVM."""
+
+    def __init__(self, jpype):
+        self.NameToStructure = jpype.JClass("uk.ac.cam.ch.wwmm.opsin.NameToStructure")
+        self.NameToStructureConfig = jpype.JClass(
+            "uk.ac.cam.ch.wwmm.opsin.NameToStructureConfig"
+        )
+        self.NameToInchi = jpype.JClass("uk.ac.cam.ch.wwmm.opsin.NameToInchi")
+        self.FAILURE = jpype.JClass(
+            "uk.ac.cam.ch.wwmm.opsin.OpsinResult$OPSIN_RESULT_STATUS"
+        ).FAILURE
+        self.instance = self.NameToStructure.getInstance()
+
+
+def _load_opsin(jar_fpath: str) -> _Opsin:
+    """Start the JVM with the OPSIN jar on its classpath, or attach to it if running.
+
+    The JVM is given the options from set_jvm_options() when it is started
+    here. A class data sharing archive from use_cds_archive() is left out,
+    since it is built for OPSIN's own command line and not JPype's classpath.
+
+    Raises:
+        ImportError: JPype is not installed.
+        RuntimeError: The JVM was started with a different jar, or OPSIN cannot be found in it.
+    """
+    import jpype
+
+    global _JVM_JAR
+    with _JVM_LOCK:
+        if not jpype.isJVMStarted():
+            jpype.startJVM(
+                *jvm_options(cds=False), classpath=[jar_fpath], convertStrings=False
+            )
+            _JVM_JAR = jar_fpath
+        elif _JVM_JAR not in (None, jar_fpath):
+            raise RuntimeError(
+                "The JVM in this process was started with {:s}, so {:s} cannot be loaded.".format(
+                    _JVM_JAR, jar_fpath
+                )
+            )
+        try:
+            return _Opsin(jpype)
+        except Exception as e:
+            raise RuntimeError(
+                "OPSIN could not be loaded into the running JVM: " + repr(e)
+            )
+
+
+# how OPSIN's command line turns a parse into each output format
+_OUTPUTS = {
+    "SMILES": lambda opsin, result: result.getSmiles(),
+    "ExtendedSMILES": lambda opsin, result: result.getExtendedSmiles(),
+    "InChI": lambda opsin, result: opsin.NameToInchi.convertResultToInChI(result),
+    "StdInChI": lambda opsin, result: opsin.NameToInchi.convertResultToStdInChI(result),
+    "StdInChIKey": lambda opsin, result: opsin.NameToInchi.convertResultToStdInChIKey(
+        result
+    ),
+}
+
+
+class OpsinJVMSession(OpsinSession):
+    """OpsinSession which runs OPSIN inside this Python process through JPype.
+
+    Names are parsed by calling OPSIN's NameToStructure directly, so nothing
+    crosses a pipe and there is no OPSIN process to manage. Each name is still
+    a separate call into the JVM. Used as a context manager, every call to
+    py2opsin() in the block is answered in process:
+
+        with OpsinJVMSession():
+            py2opsin(["ethane", "water"])
+
+    JPype (pip install JPype1) is optional. Without it the session falls back
+    to running OPSIN in a subprocess like OpsinSession, unless fallback is
+    False. A process can only hold one JVM, so every OpsinJVMSession must use
+    the same jar, and the JVM stays loaded after the session is closed.
+
+    Asking py2opsin() for a list of output formats in the block parses each
+    name once, as every format is made from the same OPSIN result.
+
+    Args:
+        jar_fpath (str, optional): Filepath to OPSIN jar file. Defaults to "default", which causes py2opsin to use its included jar.
+        fallback (bool, optional): Use a subprocess if JPype is not installed, rather than raising ImportError. Defaults to True.
+    """
+
+    def __init__(self, jar_fpath: str = "default", fallback: bool = True):
+        super().__init__(jar_fpath=jar_fpath)
+        self._configs = {}
+        # OPSIN's result for each (name, flags) while formats share parses
+        self._parses = None
+        self._sharing = 0
+        try:
+            self._opsin = _load_opsin(resolve_jar(jar_fpath))
+        except ImportError:
+            if not fallback:
+                raise ImportError(
+                    "OpsinJVMSession requires JPype, install it with 'pip install JPype1'."
+                )
+            self._opsin = None
+
+    @property
+    def in_process(self) -> bool:
+        """True if OPSIN is running in this process, False if it fell back to a subprocess."""
+        return self._opsin is not None
+
+    @contextmanager
+    def share_parses(self):
+        """Keep OPSIN's result for every name parsed in the block, so converting to another format does not parse it again."""
+        with self._lock:
+            if self._sharing == 0:
+                self._parses = {}
+            self._sharing += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._sharing -= 1
+                if self._sharing == 0:
+                    self._parses = None
+
+    def _config(
+        self,
+        allow_acid: bool,
+        allow_radicals: bool,
+        allow_bad_stereo: bool,
+        wildcard_radicals: bool,
+    ):
+        key = (allow_acid, allow_radicals, allow_bad_stereo, wildcard_radicals)
+        if key not in self._configs:
+            # the same settings OPSIN's -a, -r, -s, and -w switches make
+            config = self._opsin.NameToStructureConfig()
+            config.setInterpretAcidsWithoutTheWordAcid(allow_acid)
+            config.setAllowRadicals(allow_radicals)
+            config.setWarnRatherThanFailOnUninterpretableStereochemistry(
+                allow_bad_stereo
+            )
+            config.setOutputRadicalsAsWildCardAtoms(wildcard_radicals)
+            self._configs[key] = config
+        return self._configs[key]
+
+    def start(
+        self,
+        output_format: str = "SMILES",
+        allow_acid: bool = False,
+        allow_radicals: bool = False,
+        allow_bad_stereo: bool = False,
+        wildcard_radicals: bool = False,
+    ) -> None:
+        """Start OPSIN for the given options ahead of the first conversion.
+
+        Args are the same as for py2opsin(). Nothing needs starting in process.
+        """
+        flags = (allow_acid, allow_radicals, allow_bad_stereo, wildcard_radicals)
+        if self._opsin is None:
+            super().start(output_format, *flags)
+        else:
+            self._check_format(output_format, *flags)
+            self._config(*flags)
+
+    def _check_format(self, output_format: str, *flags) -> None:
+        if output_format not in OUTPUT_FLAGS or output_format == "CML":
+            # raises the same errors as the subprocess path
+            self._arg_list(output_format, *flags)
+
+    def _results(
+        self,
+        names: list,
+        output_format: str,
+        allow_acid: bool,
+        allow_radicals: bool,
+        allow_bad_stereo: bool,
+        wildcard_radicals: bool,
+        timeout: float = None,
+        name_timeout: float = None,
+    ) -> list:
+        """One (output, message) pair per name, message being None on success.
+
+        A call into the JVM cannot be interrupted, so timeouts only apply when
+        falling back to a subprocess.
+        """
+        flags = (allow_acid, allow_radicals, allow_bad_stereo, wildcard_radicals)
+        if self._opsin is None:
+            return super()._results(
+                names,
+                output_format,
+                *flags,
+                timeout=timeout,
+                name_timeout=name_timeout,
+            )
+        self._check_format(output_format, *flags)
+
+        opsin = self._opsin
+        parse = opsin.instance.parseChemicalName
+        to_output = _OUTPUTS[output_format]
+        config = self._config(*flags)
+        parses = self._parses
+        results = []
+        with stage("opsin"):
+            for name in names:
+                if not name.strip():
+                    results.append(("", "Cannot parse an empty name."))
+                    continue
+                text = name.replace("\r", " ").replace("\n", " ")
+                result = None if parses is None else parses.get((text, flags))
+                if result is None:
+                    result = parse(text, config)
+                    if parses is not None:
+                        parses[(text, flags)] = result
+                if result.getStatus() == opsin.FAILURE:
+                    message = result.getMessage()
+                    results.append(
+                        (
+                            "",
+                            (
+                                str(message)
+                                if message is not None
+                                else "{:s} could not be parsed.".format(name)
+                            ),
+                        )
+                    )
+                    continue
+                output = to_output(opsin, result)
+                if output is None:
+                    results.append(
+                        (
+                            "",
+                            "{:s} could not be converted to {:s}.".format(
+                                name, output_format
+                            ),
+                        )
+                    )
+                else:
+                    results.append((str(output), None))
+        return results
@@ -0,0 +1,140 @@
+import heapq
+import os
+import warnings
+from typing import Union
+
+from ._core import OpsinWorker, build_arg_list, finish_results
+from .stats import bind, recording
+
+try:
+    # python < 3.8
+    from typing import Literal
+except ImportError:
+    from typing_extensions import Literal
+
+
+def _balance(names: list, n_shards: int) -> list:
+    """Split the positions of names into n_shards lists of similar total length.
+
+    Longer names take OPSIN longer, so each name in turn from the longest down
+    goes to whichever shard has the least text so far.
+    """
+    heap = [(0, i) for i in range(n_shards)]
+    shards = [[] for _ in range(n_shards)]
+    for position in sorted(range(len(names)), key=lambda i: -len(names[i])):
+        load, shard = heapq.heappop(heap)
+        shards[shard].append(position)
+        heapq.heappush(heap, (load + len(names[position]) + 1, shard))
+    # OPSIN answers in input order, so keep each shard in input order too
+    return [sorted(shard) for shard in shards if shard]
+
+
+def py2opsin_parallel(
+    chemical_names: list,
+    output_format: Literal[
+        "SMILES",
+        "ExtendedSMILES",
+        "InChI",
+        "StdInChI",
+        "StdInChIKey",
+    ] = "SMILES",
+    allow_acid: bool = False,
+    allow_radicals: bool = False,
+    allow_bad_stereo: bool = False,
+    wildcard_radicals: bool = False,
+    jar_fpath: str = "default",
+    processes: int = None,
+    return_failures: bool = False,
+    timeout: float = None,
+    name_timeout: float = None,
+) -> Union[list, bool]:
+    """Translate a list of names with several OPSIN processes at once.
+
+    Names are dealt out so every process gets a similar amount of text, each
+    process reads its share over its own stdin, and the results are put back
+    in the original order. If the call is interrupted (e.g. with Ctrl-C) or
+    any OPSIN fails, every OPSIN is stopped before returning.
+
+    The work happens inside the OPSIN processes, so each is driven by a thread
+    of this process rather than by a Python process of its own.
+
+    Args:
+        chemical_names (list): IUPAC names of chemicals.
+        output_format (str, optional): One of "SMILES", "ExtendedSMILES", "InChI", "StdInChI", or "StdInChIKey".
+                                        Defaults to "SMILES".
+        allow_acid (bool, optional): Allow interpretation of acids. Defaults to False.
+        allow_radicals (bool, optional): Enable radical interpretation. Defaults to False.
+        allow_bad_stereo (bool, optional): Allow OPSIN to ignore uninterpreatable stereochem. Defaults to False.
+        wildcard_radicals (bool, optional): Output radicals as wildcards. Defaults to False.
+        jar_fpath (str, optional): Filepath to OPSIN jar file. Defaults to "default", which causes py2opsin to use its included jar.
+        processes (int, optional): Number of OPSIN processes to run. Defaults to os.cpu_count().
+        return_failures (bool, optional): Return a ParseFailure holding OPSIN's message in place of each name which could not be
+                                          parsed, instead of an empty string and a RuntimeWarning. Defaults to False.
+        timeout (float, optional): Seconds after which every name not yet converted is failed. Defaults to None (no limit).
+        name_timeout (float, optional): Seconds any one name may take before it is failed and its OPSIN restarted to carry
+                                        on with the rest. Defaults to None (no limit).
+
+    Returns:
+        list: Species in requested format, or empty string if it could not be parsed, in input order. False if OPSIN failed.
+    """
+    if output_format == "CML":
+        raise RuntimeError(
+            "CML output cannot be split between processes, use py2opsin instead."
+        )
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes < 1:
+        raise RuntimeError("processes must be at least 1, got {}.".format(processes))
+    arg_list = build_arg_list(
+        output_format,
+        allow_acid,
+        allow_radicals,
+        allow_bad_stereo,
+        wildcard_radicals,
+        jar_fpath,
+    )
+    names = [str(name) for name in chemical_names]
+
+    from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+    with recording("py2opsin_parallel", len(names)):
+        shards = _balance(names, min(processes, len(names)))
+        workers = []
+        finished = False
+        executor = ThreadPoolExecutor(max_workers=max(len(shards), 1))
+        try:
+            workers = [OpsinWorker(arg_list) for _ in shards]
+            convert = bind(
+                lambda worker, shard: worker.convert(
+                    [names[i] for i in shard], timeout, name_timeout
+                )
+            )
+            futures = [
+                executor.submit(convert, worker, shard)
+                for worker, shard in zip(workers, shards)
+            ]
+            # wait in short steps so Ctrl-C is noticed promptly
+            pending = futures
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    if future.exception() is not None:
+                        raise future.exception()
+            results = [None] * len(names)
+            for shard, future in zip(shards, futures):
+                for i, result in zip(shard, future.result()):
+                    results[i] = result
+            finished = True
+        except RuntimeError as e:
+            warnings.warn("Unexpected error ocurred! " + repr(e))
+            return False
+        finally:
+            if not finished:
+                # the others are still busy, so stop them rather than wait
+                for worker in workers:
+                    worker._kill()
+            executor.shutdown(wait=True)
+            for worker in workers:
+                worker.close()
+
+        return finish_results(names, results, return_failures)
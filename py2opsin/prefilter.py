@@ -0,0 +1,131 @@
+import re
+from typing import Union
+
+_INCHI = re.compile(r"InChI=1S?/")
+_INCHIKEY = re.compile(r"[A-Z]{14}-[A-Z]{10}-[A-Z]")
+_CAS = re.compile(r"\d{2,7}-\d{2}-\d")
+_CODE = re.compile(r"[A-Z]{1,6}[- ]?\d{2,}[A-Z]?")
+# characters SMILES may use, with bracket atoms and the two letter halogens
+# taken out first, since everything left must then be an organic subset atom
+_SMILES_CHARS = re.compile(r"[BCNOPSFIbcnops0-9()=#$:/\\.%+\-*]+")
+_BRACKET_ATOM = re.compile(r"\[[^\[\]]+\]")
+_RING_BOND = re.compile(r"%\d\d|\d")
+# what a SMILES string has beyond a run of atoms: bonds, branches, bracket
+# atoms, ring closures, or separate components
+_SMILES_STRUCTURE = re.compile(r"[=#()\[/\\.]|\d")
+# characters no IUPAC name or trivial name uses, leaving in the braces of
+# nested locants, the carets of superscripts as in "tricyclo[2.2.1.0^{2,6}]",
+# the tildes of CAS style superscripts as in "N~2~-acetyllysine", and the
+# double primes of locants as in 2,2':6',2"-terpyridine
+_NOT_NAME_CHARS = re.compile(r"[!?;<>|`$%&@#=]")
+_PLACEHOLDERS = frozenset(
+    ("n/a", "nan", "none", "null", "unknown", "not available", "-", "?")
+)
+# more words than any name with spaces in it, e.g. "ethyl 2-methylpropanoate"
+_MAX_WORDS = 8
+
+# why each kind of input is not sent to OPSIN
+REASONS = {
+    "empty": "Cannot parse an empty name.",
+    "placeholder": "{:s} is a placeholder for a missing name.",
+    "InChI": "{:s} is already an InChI, not a name.",
+    "InChIKey": "{:s} is already an InChIKey, not a name.",
+    "CAS": "{:s} looks like a CAS registry number, not a name.",
+    "SMILES": "{:s} looks like SMILES, not a name.",
+    "code": "{:s} looks like a product or registry code, not a name.",
+    "text": "{:s} looks like free text, not a name.",
+}
+
+
+def _is_smiles(name: str) -> bool:
+    stripped = _BRACKET_ATOM.sub("", name).replace("Cl", "").replace("Br", "")
+    if "[" in stripped or "]" in stripped:
+        return False
+    if name.isalpha() and name.islower():
+        # a word like "cobs" rather than aromatic atoms, which come with ring bonds
+        return False
+    if not any(c.isalpha() for c in name):
+        return False
+    if stripped and _SMILES_CHARS.fullmatch(stripped) is None:
+        return False
+    # parentheses must balance and every ring bond must be opened and closed
+    depth = 0
+    for c in stripped:
+        depth += {"(": 1, ")": -1}.get(c, 0)
+        if depth < 0:
+            return False
+    rings = _RING_BOND.findall(stripped)
+    return depth == 0 and all(rings.count(ring) % 2 == 0 for ring in set(rings))
+
+
+def _is_structure(smiles: str) -> bool:
+    """True for SMILES which are plainly a structure, rather than a word made of atom symbols like "BOP" or "Cobb"."""
+    return _SMILES_STRUCTURE.search(smiles) is not None or smiles.count("C") >= 2
+
+
+def classify_name(name: str) -> Union[str, None]:
+    """What kind of input a name is, if it cannot be an IUPAC or trivial name.
+
+    Only cheap string checks are made, so a few odd names may get past but
+    genuine names are never held back.
+
+    Args:
+        name (str): Input which would be sent to OPSIN.
+
+    Returns:
+        str: One of "empty", "placeholder", "InChI", "InChIKey", "CAS", "SMILES", "code", or "text".
+             None if name could be a name and should be sent to OPSIN.
+    """
+    stripped = name.strip()
+    if not stripped:
+        return "empty"
+    if stripped.lower() in _PLACEHOLDERS:
+        return "placeholder"
+    if _INCHI.match(stripped):
+        return "InChI"
+    if _INCHIKEY.fullmatch(stripped):
+        return "InChIKey"
+    if _CAS.fullmatch(stripped):
+        return "CAS"
+    if " " not in stripped and _is_smiles(stripped):
+        return "SMILES"
+    if _CODE.fullmatch(stripped):
+        return "code"
+    if _NOT_NAME_CHARS.search(stripped) or len(stripped.split()) > _MAX_WORDS:
+        return "text"
+    return None
+
+
+def _format_kind(name: str, output_format: str) -> Union[str, None]:
+    """Kind of input which is already in output_format."""
+    if output_format == "SMILES":
+        return "SMILES"
+    if output_format == "StdInChIKey":
+        return "InChIKey"
+    # OPSIN gives standard InChI as "InChI=1S/" and its other InChI as "InChI=1/"
+    if output_format == ("StdInChI" if "InChI=1S/" in name else "InChI"):
+        return "InChI"
+    return None
+
+
+def prefilter_names(names: list, output_format: str) -> dict:
+    """(output, message) pairs for every name which need not go to OPSIN, by position.
+
+    Inputs already in the requested format (e.g. SMILES when asking for
+    SMILES) are returned as they are, unchecked, except SMILES with no bonds,
+    branches, or rings and fewer than two carbons, which could as well be an
+    acronym. The rest fail with a message giving the reason.
+    """
+    skipped = {}
+    for i, name in enumerate(names):
+        kind = classify_name(name)
+        if kind is None:
+            continue
+        passthrough = kind == _format_kind(name, output_format)
+        if passthrough and kind == "SMILES":
+            passthrough = _is_structure(name.strip())
+        if passthrough:
+            skipped[i] = (name.strip(), None)
+        else:
+            skipped[i] = ("", REASONS[kind].format(name))
+    return skipped
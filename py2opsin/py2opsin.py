@@ -1,154 +1,349 @@
 import os
 import subprocess
 import sys
+import threading
+import time
 import warnings
-from difflib import get_close_matches
-from typing import Union
+from typing import Callable, Iterable, Iterator, Union
 from subprocess import CalledProcessError
 
+from ._core import (
+    OpsinWorker,
+    TimeoutMessage,
+    active_session,
+    bind_sessions,
+    build_arg_list,
+    clean_stderr,
+    compact_output,
+    compact_pairs,
+    finish_compact,
+    finish_results,
+    jar_identity,
+    pair_messages,
+    warn_opsin_errors,
+)
+from .cache import OpsinCache, OpsinDiskCache
+from .columns import convert_column, is_column
+from .prefilter import prefilter_names
+from .results import OpsinResults, ParseFailure, Progress, RelaxedResult
+from .stats import bind, count, recording, stage
+
 try:
     # python < 3.8
     from typing import Literal
 except ImportError:
     from typing_extensions import Literal
 
-try:
-    # python < 3.9
-    from importlib.resources import files
-
-    pkg_fopen = lambda fname: files("py2opsin") / fname
-except ImportError:
-    from pkg_resources import resource_filename
-
-    pkg_fopen = lambda fname: resource_filename(__name__, fname)
-
-# check if java is installed
-try:
-    result = subprocess.run(
-        ["java", "-version"],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-        check=True,
-    )
-except Exception as e:
-    warnings.warn(
-        "Java may not be installed/accessible (java -version raised exception). "
-        "Java 8 or newer is required to use py2opsin. Original Error:\n" + repr(e),
-        category=RuntimeWarning,
-    )
-
 
 def py2opsin(
     chemical_name: Union[str, list],
-    output_format: Literal[
-        "SMILES",
-        "ExtendedSMILES",
-        "CML",
-        "InChI",
-        "StdInChI",
-        "StdInChIKey",
+    output_format: Union[
+        Literal[
+            "SMILES",
+            "ExtendedSMILES",
+            "CML",
+            "InChI",
+            "StdInChI",
+            "StdInChIKey",
+        ],
+        list,
     ] = "SMILES",
     allow_acid: bool = False,
     allow_radicals: bool = False,
     allow_bad_stereo: bool = False,
     wildcard_radicals: bool = False,
     jar_fpath: str = "default",
-    tmp_fpath: str = "py2opsin_temp_input.txt",
+    tmp_fpath: str = None,
+    cache: Union[OpsinCache, OpsinDiskCache] = None,
+    return_failures: bool = False,
+    chunk_size: int = 100000,
+    chunk_workers: int = 1,
+    progress: Callable[[Progress], None] = None,
+    timeout: float = None,
+    name_timeout: float = None,
+    compact: bool = False,
+    prefilter: bool = False,
+    retry_flags: list = None,
 ) -> str:
     """Simple passthrough to opsin, returning results as Python strings.
 
+    When called inside a `with OpsinSession():` block the already running OPSIN
+    is reused instead of launching a new one (except for CML output).
+
     Args:
-        chemical_name (str, list): IUPAC name of chemical as string, or list of strings.
-        output_format (str, optional): One of "SMILES", "ExtendedSMILES", "CML", "InChI", "StdInChI", or "StdInChIKey".
-                                        Defaults to "SMILES".
+        chemical_name (str, list): IUPAC name of chemical as string, or list of strings. A pandas Series or NumPy array
+                                   is also accepted, see Returns.
+        output_format (str, list, optional): One of "SMILES", "ExtendedSMILES", "CML", "InChI", "StdInChI", or "StdInChIKey".
+                                              Defaults to "SMILES". Pass a list of these to get every format at once.
         allow_acid (bool, optional): Allow interpretation of acids. Defaults to False.
         allow_radicals (bool, optional): Enable radical interpretation. Defaults to False.
         allow_bad_stereo (bool, optional): Allow OPSIN to ignore uninterpreatable stereochem. Defaults to False.
         wildcard_radicals (bool, optional): Output radicals as wildcards. Defaults to False.
         jar_fpath (str, optional): Filepath to OPSIN jar file. Defaults to "default", which causes py2opsin to use its included jar.
-        tmp_fpath (str, optional): Name for temporary file used for calling OPSIN. Defaults to "py2opsin_temp_input.txt".
-                                   When multiprocessing, set this to a unique name for each process.
+        tmp_fpath (str, optional): Name for a temporary file to pass input to OPSIN through. Defaults to None, which sends
+                                   input over stdin so that concurrent calls never collide. If given when multiprocessing,
+                                   set this to a unique name for each process, or use py2opsin_parallel instead.
+        cache (OpsinCache, OpsinDiskCache, optional): Cache to consult before calling OPSIN and to store new results in. Repeated names
+                                      in a list are only sent to OPSIN once. Not used for CML output. Defaults to None.
+        return_failures (bool, optional): Return a ParseFailure holding OPSIN's message in place of each name which could not be
+                                          parsed, instead of an empty string and a RuntimeWarning. Not supported for CML output.
+                                          Defaults to False.
+        chunk_size (int, optional): Most names sent to each OPSIN at once. Longer lists are split into chunks, and if OPSIN
+                                    crashes on one chunk the results of the others are still returned. Not used for CML
+                                    output. Defaults to 100000.
+        chunk_workers (int, optional): Number of chunks to convert at the same time, each with its own OPSIN. Defaults to 1.
+        progress (callable, optional): Called with a Progress record of names done, rate, and ETA after each chunk. Defaults to None.
+        timeout (float, optional): Seconds after which every name not yet converted is failed, keeping the results already
+                                   in hand. Input is then always sent over stdin. Not used for CML output. Defaults to None (no limit).
+        name_timeout (float, optional): Seconds any one name may take before it is failed and OPSIN is restarted to carry on
+                                        with the rest. Not used for CML output. Defaults to None (no limit).
+        compact (bool, optional): Return an OpsinResults, which holds the results of a list in a single buffer and
+                                  decodes them only when accessed, instead of a list of strings. Not used for CML
+                                  output. Defaults to False.
+        prefilter (bool, optional): Check names with quick pattern matches first and only send plausible names to OPSIN.
+                                    Inputs which are already SMILES, InChI, InChIKeys, CAS numbers, codes, placeholders,
+                                    or free text fail with the reason, except those already in output_format, which are
+                                    returned unchanged. Not used for CML output. Defaults to False.
+        retry_flags (list, optional): Ordered list of dicts of flags to relax, e.g. [{"allow_bad_stereo": True},
+                                      {"allow_acid": True, "allow_radicals": True}]. Names which fail are sent to OPSIN
+                                      again with each set of flags in turn until they parse, and are then returned as a
+                                      RelaxedResult recording the flags used (not kept with compact=True). Only names
+                                      which failed are sent again. Not used for CML output. Defaults to None.
 
     Returns:
         str: Species in requested format, or False if not found or an error ocurred. List of strings if input is list.
+             When output_format is a list, a dict of format to result (or list of dicts) is returned instead,
+             or with compact=True and a list of names, a dict of format to OpsinResults.
+             For a pandas Series, a Series with the same index (a DataFrame with a column per format if output_format
+             is a list), holding None where the input was null. For a NumPy array, an object array (or dict of them).
     """
-    # path to OPSIN jar
-    if jar_fpath == "default":
-        jar_fpath = pkg_fopen("opsin-cli-2.8.0-jar-with-dependencies.jar")
-
-    # default arguments to start
-    arg_list = ["java", "-jar", jar_fpath]
-
-    # format the output argument
-    if output_format == "SMILES":
-        arg_list.append("-osmi")
-    elif output_format == "ExtendedSMILES":
-        arg_list.append("-oextendedsmiles")
-    elif output_format == "CML":
-        arg_list.append("-ocml")
-    elif output_format == "InChI":
-        arg_list.append("-oinchi")
-    elif output_format == "StdInChI":
-        arg_list.append("-ostdinchi")
-    elif output_format == "StdInChIKey":
-        arg_list.append("-ostdinchikey")
-    else:
-        possiblity = get_close_matches(
+    if isinstance(chemical_name, str):
+        # e.g. numpy.str_, which should not be iterated over like a list
+        chemical_name = str(chemical_name)
+    if is_column(chemical_name):
+        return convert_column(
+            chemical_name,
             output_format,
-            [
-                "SMILES",
-                "CML",
-                "InChI",
-                "StdInChI",
-                "StdInChIKey",
-                "ExtendedSMILES",
-            ],
-            n=1,
+            dict(
+                allow_acid=allow_acid,
+                allow_radicals=allow_radicals,
+                allow_bad_stereo=allow_bad_stereo,
+                wildcard_radicals=wildcard_radicals,
+                jar_fpath=jar_fpath,
+                tmp_fpath=tmp_fpath,
+                cache=cache,
+                return_failures=return_failures,
+                chunk_size=chunk_size,
+                chunk_workers=chunk_workers,
+                progress=progress,
+                timeout=timeout,
+                name_timeout=name_timeout,
+                prefilter=prefilter,
+                retry_flags=retry_flags,
+            ),
         )
-        addendum = (
-            " Did you mean '{:s}'?".format(possiblity[0])
-            if possiblity
-            else " Try help(py2opsin)."
+    if not isinstance(output_format, str):
+        return _multi_format(
+            chemical_name,
+            list(output_format),
+            allow_acid,
+            allow_radicals,
+            allow_bad_stereo,
+            wildcard_radicals,
+            jar_fpath,
+            tmp_fpath,
+            cache,
+            return_failures,
+            chunk_size,
+            chunk_workers,
+            progress,
+            timeout,
+            name_timeout,
+            compact,
+            prefilter,
+            retry_flags,
         )
+
+    if chunk_size < 1 or chunk_workers < 1:
         raise RuntimeError(
-            "Output format {:s} is invalid.".format(output_format) + addendum
+            "chunk_size and chunk_workers must be at least 1, got {} and {}.".format(
+                chunk_size, chunk_workers
+            )
         )
+    arg_list = build_arg_list(
+        output_format,
+        allow_acid,
+        allow_radicals,
+        allow_bad_stereo,
+        wildcard_radicals,
+        jar_fpath,
+    )
 
-    # write the input to a text file
-    with open(tmp_fpath, "w") as file:
-        if type(chemical_name) is str:
-            file.write(chemical_name)
-        else:
-            file.writelines("\n".join(chemical_name) + "\n")
-
-    # add the temporary file to the args
-    arg_list.append(tmp_fpath)
+    retry_options = _retry_options(
+        retry_flags,
+        output_format,
+        allow_acid,
+        allow_radicals,
+        allow_bad_stereo,
+        wildcard_radicals,
+    )
 
-    # grab the optional boolean flags
-    if allow_acid:
-        arg_list.append("-a")
-    if allow_radicals:
-        arg_list.append("-r")
-    if allow_bad_stereo:
-        arg_list.append("-s")
-    if wildcard_radicals:
-        arg_list.append("-w")
+    if output_format == "CML":
+        if return_failures:
+            raise RuntimeError("return_failures is not supported for CML output.")
+        return _run_cml(chemical_name, arg_list, tmp_fpath)
 
-    # do the call
-    result = subprocess.run(
-        arg_list,
-        stderr=subprocess.PIPE,
-        stdout=subprocess.PIPE,
+    names = [chemical_name] if type(chemical_name) is str else list(chemical_name)
+    options = (
+        output_format,
+        allow_acid,
+        allow_radicals,
+        allow_bad_stereo,
+        wildcard_radicals,
     )
+    with recording("py2opsin", len(names)):
+        skipped = {}
+        if prefilter:
+            with stage("prefilter"):
+                skipped = prefilter_names(names, output_format)
+        to_convert = names
+        if skipped:
+            to_convert = [name for i, name in enumerate(names) if i not in skipped]
+        # results can only stay compact if nothing needs merging back into them
+        as_compact = compact and type(chemical_name) is not str
+        as_compact = as_compact and not skipped and not retry_options
+        results = []
+        if to_convert:
+            results = _chunked_results(
+                to_convert,
+                options,
+                jar_fpath,
+                tmp_fpath,
+                cache,
+                chunk_size,
+                chunk_workers,
+                progress,
+                timeout,
+                name_timeout,
+                as_compact,
+            )
+        if results is False:
+            return False
+        if retry_options and results:
+            results = _retry_relaxed(
+                to_convert,
+                results,
+                retry_options,
+                jar_fpath,
+                tmp_fpath,
+                cache,
+                chunk_size,
+                chunk_workers,
+                (timeout, name_timeout),
+            )
+        if skipped:
+            converted = iter(results)
+            results = [
+                skipped[i] if i in skipped else next(converted)
+                for i in range(len(names))
+            ]
+        if compact and type(chemical_name) is not str and isinstance(results, list):
+            results = compact_pairs(names, results)
+
+        if isinstance(results, OpsinResults):
+            return finish_compact(results, return_failures)
+        outputs = finish_results(names, results, return_failures)
+    return outputs[0] if type(chemical_name) is str else outputs
+
+
+# flags which retry_flags may relax, in the order they appear in options
+_FLAGS = ("allow_acid", "allow_radicals", "allow_bad_stereo", "wildcard_radicals")
+
+
+def _retry_options(retry_flags: list, output_format: str, *flags) -> list:
+    """Options tuple for each set of flags in retry_flags, checking every flag is known."""
+    if not retry_flags:
+        return []
+    retry_options = []
+    for overrides in retry_flags:
+        unknown = set(overrides) - set(_FLAGS)
+        if unknown:
+            raise RuntimeError(
+                "retry_flags can only set {:s}, got {:s}.".format(
+                    ", ".join(_FLAGS), ", ".join(sorted(unknown))
+                )
+            )
+        relaxed = dict(zip(_FLAGS, flags), **overrides)
+        options = (output_format,) + tuple(relaxed[flag] for flag in _FLAGS)
+        # flags which relax nothing would only fail the same names again
+        if options != (output_format,) + flags and options not in retry_options:
+            retry_options.append(options)
+    return retry_options
+
+
+def _retry_relaxed(
+    names: list,
+    results: list,
+    retry_options: list,
+    jar_fpath: str,
+    tmp_fpath: str,
+    cache: Union[OpsinCache, OpsinDiskCache],
+    chunk_size: int,
+    chunk_workers: int,
+    timeouts: tuple,
+) -> list:
+    """Send only the names which failed to OPSIN again with each set of relaxed flags in turn.
+
+    Names which parse are given as a RelaxedResult, and those which never do
+    keep their first message. Names which timed out are not retried, and the
+    overall timeout covers the retries too.
+    """
+    timeout, name_timeout = timeouts
+    deadline = None if timeout is None else time.monotonic() + timeout
+    results = list(results)
+    for options in retry_options:
+        failed = [
+            i
+            for i, (_, message) in enumerate(results)
+            if message is not None and not isinstance(message, TimeoutMessage)
+        ]
+        if not failed:
+            break
+        remaining = None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+        with stage("retry"):
+            retried = _chunked_results(
+                [names[i] for i in failed],
+                options,
+                jar_fpath,
+                tmp_fpath,
+                cache,
+                chunk_size,
+                chunk_workers,
+                None,
+                remaining,
+                name_timeout,
+            )
+        if retried is False:
+            continue
+        flags = dict(zip(_FLAGS, options[1:]))
+        for i, (output, message) in zip(failed, retried):
+            if message is None:
+                results[i] = (RelaxedResult(output, flags), None)
+    return results
+
+
+def _run_cml(chemical_name: Union[str, list], arg_list: list, tmp_fpath: str):
+    """CML is one document rather than a line per name, so it is returned as is."""
+    result = _run_opsin(chemical_name, arg_list, tmp_fpath)
 
     # warn user if any of the inputs could not be parsed
-    if result.stderr:
-        err_str = result.stderr.decode(encoding=sys.stderr.encoding)
-        warnings.warn(
-            "OPSIN raised the following error(s) while parsing:"
-            "\n > " + err_str.replace("\n", "\n > ", err_str.count("\n") - 1),
-            RuntimeWarning,
-        )
+    err_str = _stderr_text(result)
+    if err_str:
+        warn_opsin_errors(err_str)
 
     # parse and return the result
     try:
@@ -167,7 +362,434 @@ def py2opsin(
             )
 
     except Exception as e:
-        warnings.warn("Unexpected error ocurred! " + e)
+        warnings.warn("Unexpected error ocurred! " + repr(e))
+        return False
+
+
+def _multi_format(
+    chemical_name: Union[str, list],
+    output_formats: list,
+    allow_acid: bool,
+    allow_radicals: bool,
+    allow_bad_stereo: bool,
+    wildcard_radicals: bool,
+    jar_fpath: str,
+    tmp_fpath: str,
+    cache: Union[OpsinCache, OpsinDiskCache],
+    return_failures: bool,
+    chunk_size: int,
+    chunk_workers: int,
+    progress: Callable[[Progress], None],
+    timeout: float,
+    name_timeout: float,
+    compact: bool,
+    prefilter: bool,
+    retry_flags: list,
+) -> Union[dict, list, bool]:
+    """py2opsin for several output formats, with one OPSIN running per format at once.
+
+    Inside an OpsinJVMSession running in process the formats are converted in
+    turn instead, sharing one parse of each name between them.
+    """
+    if not output_formats:
+        raise RuntimeError("At least one output format must be requested.")
+    # check every format before launching anything
+    for output_format in output_formats:
+        build_arg_list(
+            output_format,
+            allow_acid,
+            allow_radicals,
+            allow_bad_stereo,
+            wildcard_radicals,
+            jar_fpath,
+        )
+
+    def convert(output_format: str):
+        return py2opsin(
+            chemical_name,
+            output_format=output_format,
+            allow_acid=allow_acid,
+            allow_radicals=allow_radicals,
+            allow_bad_stereo=allow_bad_stereo,
+            wildcard_radicals=wildcard_radicals,
+            jar_fpath=jar_fpath,
+            # each concurrent OPSIN needs its own input file
+            tmp_fpath=tmp_fpath and "{:s}.{:s}".format(tmp_fpath, output_format),
+            cache=cache,
+            return_failures=return_failures,
+            chunk_size=chunk_size,
+            chunk_workers=chunk_workers,
+            progress=progress,
+            timeout=timeout,
+            name_timeout=name_timeout,
+            compact=compact,
+            prefilter=prefilter,
+            retry_flags=retry_flags,
+        )
+
+    output_formats = list(dict.fromkeys(output_formats))
+    session = active_session(jar_fpath)
+    if getattr(session, "in_process", False):
+        with session.share_parses():
+            results = [convert(output_format) for output_format in output_formats]
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=len(output_formats)) as executor:
+            futures = [
+                executor.submit(bind_sessions(convert), output_format)
+                for output_format in output_formats
+            ]
+            results = [future.result() for future in futures]
+
+    if any(result is False for result in results):
         return False
+    if type(chemical_name) is str or compact:
+        return dict(zip(output_formats, results))
+    return [dict(zip(output_formats, record)) for record in zip(*results)]
+
+
+def _run_opsin(
+    chemical_name: Union[str, list], arg_list: list, tmp_fpath: str = None
+) -> subprocess.CompletedProcess:
+    """Launch OPSIN once on the given input, capturing its output.
+
+    Input goes over stdin unless tmp_fpath is given, in which case it is
+    written to that file and OPSIN is pointed at it.
+    """
+    count("spawns")
+    if tmp_fpath is None:
+        with stage("write"):
+            if type(chemical_name) is str:
+                payload = chemical_name + "\n"
+            else:
+                payload = "\n".join(chemical_name) + "\n"
+            payload = payload.encode("utf-8")
+        count("bytes_in", len(payload))
+        with stage("opsin"):
+            result = subprocess.run(
+                arg_list,
+                input=payload,
+                stderr=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        count("bytes_out", len(result.stdout))
+        return result
+
+    # write the input to a text file
+    with stage("write"):
+        with open(tmp_fpath, "w") as file:
+            if type(chemical_name) is str:
+                file.write(chemical_name)
+            else:
+                file.writelines("\n".join(chemical_name) + "\n")
+    count("bytes_in", os.path.getsize(tmp_fpath))
+
+    # do the call
+    try:
+        with stage("opsin"):
+            result = subprocess.run(
+                arg_list + [tmp_fpath],
+                stderr=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        count("bytes_out", len(result.stdout))
+        return result
     finally:
         os.remove(tmp_fpath)
+
+
+def _stderr_text(result: subprocess.CompletedProcess) -> str:
+    """OPSIN's error output without the banner it prints when reading stdin."""
+    if not result.stderr:
+        return ""
+    err_str = clean_stderr(result.stderr.decode(encoding=sys.stderr.encoding))
+    return err_str + "\n" if err_str else ""
+
+
+def _opsin_results(
+    names: list,
+    options: tuple,
+    jar_fpath: str,
+    tmp_fpath: str,
+    timeouts: tuple = (None, None),
+    compact: bool = False,
+) -> Union[list, OpsinResults, bool]:
+    """One (output, message) pair per name from OPSIN, or False if OPSIN crashed.
+
+    A running session is used if the caller has opened one, then a daemon
+    if one is reachable (see OpsinDaemon). timeouts is the
+    (timeout, name_timeout) pair given to py2opsin(). With compact, OPSIN's
+    output is wrapped in an OpsinResults where possible rather than decoded.
+    """
+    timeout, name_timeout = timeouts
+    session = active_session(jar_fpath)
+    if session is not None:
+        return session._results(
+            names, *options, timeout=timeout, name_timeout=name_timeout
+        )
+    from .daemon import daemon_results
+
+    results = daemon_results(names, options, jar_fpath, timeouts)
+    if results is not None:
+        return results
+
+    if timeout is not None or name_timeout is not None:
+        # only a running OPSIN can be watched name by name
+        worker = OpsinWorker(build_arg_list(*options, jar_fpath))
+        try:
+            return worker.convert(names, timeout, name_timeout)
+        finally:
+            worker.close()
+
+    result = _run_opsin(names, build_arg_list(*options, jar_fpath), tmp_fpath)
+    err_str = _stderr_text(result)
+    if result.returncode:
+        if err_str:
+            warn_opsin_errors(err_str)
+        warnings.warn(
+            "Unexpected error ocurred! OPSIN exited with return code {}.".format(
+                result.returncode
+            )
+        )
+        return False
+    with stage("decode"):
+        if compact:
+            return compact_output(result.stdout, names, err_str)
+        outputs = (
+            result.stdout.decode(encoding=sys.stdout.encoding)
+            .replace("\r", "")
+            .split("\n")[0:-1]  # ignore newline at file end
+        )
+        return pair_messages(outputs, err_str, names)
+
+
+class _ProgressTracker:
+    """Adds up names done across chunks, which may finish on different threads."""
+
+    def __init__(self, total: int, callback: Callable[[Progress], None]):
+        self.total = total
+        self.callback = callback
+        self.done = 0
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def update(self, n_done: int) -> None:
+        if self.callback is None:
+            return
+        with self._lock:
+            self.done += n_done
+            elapsed = time.perf_counter() - self.start
+            rate = self.done / elapsed if elapsed else 0.0
+            eta = (self.total - self.done) / rate if rate else None
+            self.callback(Progress(self.done, self.total, rate, eta))
+
+
+def _chunked_results(
+    names: list,
+    options: tuple,
+    jar_fpath: str,
+    tmp_fpath: str,
+    cache: Union[OpsinCache, OpsinDiskCache],
+    chunk_size: int,
+    chunk_workers: int,
+    progress: Callable[[Progress], None],
+    timeout: float = None,
+    name_timeout: float = None,
+    compact: bool = False,
+) -> Union[list, OpsinResults, bool]:
+    """Results for chunk_size names at a time, so a crash loses only its own chunk.
+
+    Names in a chunk OPSIN failed on are given a message saying so. False is
+    only returned if every chunk failed. timeout covers every chunk together.
+    With compact, an OpsinResults is returned rather than a list of pairs.
+    """
+    tracker = _ProgressTracker(len(names), progress)
+    starts = range(0, len(names), chunk_size)
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    def convert(i: int, start: int):
+        end = start + chunk_size
+        chunk = names[start:end]
+        # each concurrent OPSIN needs its own input file
+        if tmp_fpath is not None and chunk_workers > 1 and len(starts) > 1:
+            chunk_tmp_fpath = "{:s}.{:d}".format(tmp_fpath, i)
+        else:
+            chunk_tmp_fpath = tmp_fpath
+        timeouts = (
+            None if deadline is None else max(deadline - time.monotonic(), 0),
+            name_timeout,
+        )
+        try:
+            results = _results(
+                chunk, options, jar_fpath, chunk_tmp_fpath, cache, timeouts, compact
+            )
+        except RuntimeError as e:
+            # a session's OPSIN died part way through this chunk
+            warnings.warn("Unexpected error ocurred! " + repr(e))
+            results = False
+        tracker.update(len(chunk))
+        return results
+
+    if len(starts) <= 1:
+        results = convert(0, 0)
+        if compact and isinstance(results, list):
+            return compact_pairs(names, results)
+        return results
+
+    if chunk_workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=chunk_workers) as executor:
+            chunk_results = list(
+                executor.map(bind(bind_sessions(convert)), range(len(starts)), starts)
+            )
+    else:
+        chunk_results = [convert(i, start) for i, start in enumerate(starts)]
+
+    if all(chunk is False for chunk in chunk_results):
+        return False
+    results = []
+    for start, chunk in zip(starts, chunk_results):
+        end = start + chunk_size
+        if chunk is False:
+            message = "OPSIN failed while converting this chunk of names."
+            chunk = [("", message)] * len(names[start:end])
+        if compact and isinstance(chunk, list):
+            chunk = compact_pairs(names[start:end], chunk)
+        if compact:
+            results.append(chunk)
+        else:
+            results.extend(chunk)
+    return OpsinResults._concatenate(results) if compact else results
+
+
+def _results(
+    names: list,
+    options: tuple,
+    jar_fpath: str,
+    tmp_fpath: str,
+    cache: Union[OpsinCache, OpsinDiskCache],
+    timeouts: tuple = (None, None),
+    compact: bool = False,
+) -> Union[list, OpsinResults, bool]:
+    if cache is not None:
+        return _cached_results(names, options, jar_fpath, cache, tmp_fpath, timeouts)
+    return _opsin_results(names, options, jar_fpath, tmp_fpath, timeouts, compact)
+
+
+def _cached_results(
+    names: list,
+    options: tuple,
+    jar_fpath: str,
+    cache: Union[OpsinCache, OpsinDiskCache],
+    tmp_fpath: str,
+    timeouts: tuple = (None, None),
+) -> Union[list, bool]:
+    """_opsin_results, but only sending unique names missing from the cache to OPSIN.
+
+    Names which timed out are not cached, since they may succeed another time.
+    """
+    key_base = options + (jar_identity(jar_fpath),)
+    unique = list(dict.fromkeys(names))
+    with stage("cache"):
+        found = cache.get_many([(name,) + key_base for name in unique])
+    results = {key[0]: pair for key, pair in found.items()}
+    misses = [name for name in unique if name not in results]
+
+    if misses:
+        new = _opsin_results(misses, options, jar_fpath, tmp_fpath, timeouts)
+        if new is False:
+            return False
+        results.update(zip(misses, new))
+        with stage("cache"):
+            cache.put_many(
+                {
+                    (name,) + key_base: pair
+                    for name, pair in zip(misses, new)
+                    if not isinstance(pair[1], TimeoutMessage)
+                }
+            )
+
+    return [results[name] for name in names]
+
+
+def py2opsin_iter(
+    chemical_names: Iterable[str],
+    output_format: Literal[
+        "SMILES",
+        "ExtendedSMILES",
+        "InChI",
+        "StdInChI",
+        "StdInChIKey",
+    ] = "SMILES",
+    allow_acid: bool = False,
+    allow_radicals: bool = False,
+    allow_bad_stereo: bool = False,
+    wildcard_radicals: bool = False,
+    jar_fpath: str = "default",
+    buffer_size: int = 1000,
+    return_failures: bool = False,
+) -> Iterator[str]:
+    """Lazily translate names from any iterable, yielding results as OPSIN produces them.
+
+    Names are fed to a dedicated OPSIN process as they are consumed, so memory use stays
+    constant however many names there are. Trailing newlines are stripped, so an open
+    file can be passed directly.
+
+    Args:
+        chemical_names (iterable): IUPAC names of chemicals, e.g. a list, generator, or open file.
+        output_format (str, optional): One of "SMILES", "ExtendedSMILES", "InChI", "StdInChI", or "StdInChIKey".
+                                        Defaults to "SMILES".
+        allow_acid (bool, optional): Allow interpretation of acids. Defaults to False.
+        allow_radicals (bool, optional): Enable radical interpretation. Defaults to False.
+        allow_bad_stereo (bool, optional): Allow OPSIN to ignore uninterpreatable stereochem. Defaults to False.
+        wildcard_radicals (bool, optional): Output radicals as wildcards. Defaults to False.
+        jar_fpath (str, optional): Filepath to OPSIN jar file. Defaults to "default", which causes py2opsin to use its included jar.
+        buffer_size (int, optional): Most names sent to OPSIN ahead of the results consumed so far. Also the number of
+                                     failures collected into each RuntimeWarning. Defaults to 1000.
+        return_failures (bool, optional): Yield a ParseFailure holding OPSIN's message for each name which could not be
+                                          parsed, instead of an empty string and a RuntimeWarning. Defaults to False.
+
+    Yields:
+        str: Species in requested format, or empty string if it could not be parsed, in input order.
+    """
+    if output_format == "CML":
+        raise RuntimeError("CML output cannot be streamed, use py2opsin instead.")
+    arg_list = build_arg_list(
+        output_format,
+        allow_acid,
+        allow_radicals,
+        allow_bad_stereo,
+        wildcard_radicals,
+        jar_fpath,
+    )
+    return _stream(arg_list, chemical_names, buffer_size, return_failures)
+
+
+def _stream(
+    arg_list: list,
+    chemical_names: Iterable[str],
+    buffer_size: int,
+    return_failures: bool,
+):
+    """Generator behind py2opsin_iter, so that bad arguments raise immediately."""
+    worker = OpsinWorker(arg_list)
+    messages = []
+    try:
+        for name, (output, message) in worker.stream(
+            (name.rstrip("\r\n") for name in chemical_names), buffer_size
+        ):
+            if message is not None and return_failures:
+                yield ParseFailure(name, message)
+                continue
+            if message is not None:
+                messages.append(message)
+                if len(messages) >= buffer_size:
+                    warn_opsin_errors("\n".join(messages) + "\n")
+                    messages = []
+            yield output
+        if messages:
+            warn_opsin_errors("\n".join(messages) + "\n")
+    finally:
+        worker.close()
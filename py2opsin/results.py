@@ -0,0 +1,209 @@
+from array import array
+from collections.abc import Sequence
+from typing import NamedTuple
+
+
+class ParseFailure(NamedTuple):
+    """Result in place of a name OPSIN could not parse, when return_failures=True.
+
+    Falsy like the empty string returned otherwise, so `if result:` checks keep
+    working.
+
+    Attributes:
+        name (str): The name as it was given to py2opsin.
+        message (str): OPSIN's explanation of why the name could not be parsed.
+    """
+
+    name: str
+    message: str
+
+    def __bool__(self):
+        return False
+
+
+class WarmUpReport(NamedTuple):
+    """Returned by OpsinSession.warm_up().
+
+    Attributes:
+        names (int): Names parsed while warming up.
+        rounds (int): Times the corpus was sent through OPSIN.
+        seconds (float): Time spent warming up, including starting OPSIN.
+        rate (float): Names parsed per second in the last round.
+        steady (bool): True if the rate had stopped improving, False if max_seconds ran out first.
+    """
+
+    names: int
+    rounds: int
+    seconds: float
+    rate: float
+    steady: bool
+
+
+class RelaxedResult(str):
+    """Result for a name which only parsed once its flags were relaxed by retry_flags.
+
+    Equal to, and usable as, the plain string result.
+
+    Attributes:
+        flags (dict): Value of every flag (allow_acid, allow_radicals, allow_bad_stereo, and wildcard_radicals) in the retry
+                      which succeeded.
+    """
+
+    def __new__(cls, value: str, flags: dict):
+        result = super().__new__(cls, value)
+        result.flags = flags
+        return result
+
+    def __getnewargs__(self):
+        return (str(self), self.flags)
+
+    def __repr__(self):
+        return "RelaxedResult({!r}, flags={!r})".format(str(self), self.flags)
+
+
+class Progress(NamedTuple):
+    """Passed to the progress callback of py2opsin() after each chunk of names.
+
+    Attributes:
+        done (int): Names converted so far.
+        total (int): Names given.
+        rate (float): Names converted per second so far.
+        eta (float): Estimated seconds until every name is converted, None until the rate is known.
+    """
+
+    done: int
+    total: int
+    rate: float
+    eta: float
+
+
+class OpsinResults(Sequence):
+    """Compact, read-only list of results, returned by py2opsin(..., compact=True).
+
+    Results are kept as OPSIN wrote them, in one bytes buffer holding a line
+    per name, with an array of where each line ends and a record of only the
+    names which failed. That is a few bytes of overhead per name rather than
+    a Python string each, and items are decoded only when accessed.
+
+    Indexing and iteration give the same values as the list py2opsin returns,
+    i.e. an empty string (or a ParseFailure with return_failures=True) for each
+    name which could not be parsed. Slices give lists.
+
+    Attributes:
+        return_failures (bool): Give ParseFailure records instead of empty strings for failed names.
+    """
+
+    def __init__(
+        self,
+        data: bytes,
+        ends: array,
+        failures: dict,
+        return_failures: bool = False,
+    ):
+        # OPSIN's output, one line per name, ends[i] being the newline after name i
+        self._data = data
+        self._ends = ends
+        # position of each name which failed: (name, message)
+        self._failures = failures
+        self.return_failures = return_failures
+
+    def _item(self, i: int):
+        if i in self._failures:
+            if self.return_failures:
+                return ParseFailure(*self._failures[i])
+            return ""
+        start = self._ends[i - 1] + 1 if i else 0
+        end = self._ends[i]
+        return self._data[start:end].decode("utf-8")
+
+    def __len__(self):
+        return len(self._ends)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._item(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("OpsinResults index out of range")
+        return self._item(index)
+
+    def __iter__(self):
+        return (self._item(i) for i in range(len(self)))
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, OpsinResults)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return "OpsinResults({:d} results, {:d} failed)".format(
+            len(self), len(self._failures)
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the buffer and line ends, ignoring the few failure records."""
+        return len(self._data) + self._ends.itemsize * len(self._ends)
+
+    @property
+    def failure_mask(self) -> bytearray:
+        """One byte per name, 1 where the name failed, e.g. for numpy.frombuffer(mask, dtype=bool)."""
+        mask = bytearray(len(self))
+        for i in self._failures:
+            mask[i] = 1
+        return mask
+
+    def failures(self) -> list:
+        """ParseFailure record for every name which failed, in order."""
+        return [ParseFailure(*self._failures[i]) for i in sorted(self._failures)]
+
+    def to_list(self) -> list:
+        """Plain list, the same as py2opsin returns without compact=True."""
+        return list(self)
+
+    def to_pandas(self, index=None):
+        """pandas Series of the results, with failed names as None. Requires pandas."""
+        import pandas as pd
+
+        values = [
+            None if i in self._failures else value for i, value in enumerate(self)
+        ]
+        return pd.Series(values, index=index, dtype=object)
+
+    def to_arrow(self):
+        """pyarrow LargeStringArray sharing one buffer, with failed names as nulls. Requires pyarrow."""
+        import pyarrow as pa
+
+        n = len(self)
+        # dropping the newlines leaves every value's bytes directly after the last
+        values = self._data.replace(b"\n", b"")
+        offsets = array("q", [0])
+        offsets.extend(end - i for i, end in enumerate(self._ends))
+        validity = bytearray(b"\xff" * ((n + 7) // 8))
+        for i in self._failures:
+            validity[i // 8] &= ~(1 << (i % 8)) & 0xFF
+        return pa.LargeStringArray.from_buffers(
+            n,
+            pa.py_buffer(offsets),
+            pa.py_buffer(values),
+            pa.py_buffer(validity),
+            len(self._failures),
+        )
+
+    @classmethod
+    def _concatenate(cls, parts: list, return_failures: bool = False):
+        """Join results for consecutive chunks of names into one."""
+        data = b"".join(part._data for part in parts)
+        ends = array("q")
+        failures = {}
+        base = 0
+        n_done = 0
+        for part in parts:
+            ends.extend(end + base for end in part._ends)
+            failures.update(
+                (i + n_done, record) for i, record in part._failures.items()
+            )
+            base += len(part._data)
+            n_done += len(part)
+        return cls(data, ends, failures, return_failures)
@@ -0,0 +1,341 @@
+import itertools
+import os
+import threading
+import time
+from typing import Union
+
+from ._core import (
+    _ACTIVE_SESSIONS,
+    OpsinWorker,
+    build_arg_list,
+    enter_session,
+    exit_session,
+    finish_results,
+    warmup_names,
+)
+from .results import WarmUpReport
+from .stats import bind, recording
+
+try:
+    # python < 3.8
+    from typing import Literal
+except ImportError:
+    from typing_extensions import Literal
+
+# fewest names per OPSIN process in each round of OpsinSession.warm_up
+_WARM_UP_ROUND = 1000
+
+
+class OpsinSession:
+    """Keep OPSIN running between calls so the JVM only starts once.
+
+    One OPSIN process is started lazily for each combination of output format
+    and flags that is requested, and names are streamed to it over stdin.
+    Used as a context manager, the session is also picked up by every call to
+    py2opsin() in the same thread using the same jar until the block exits:
+
+        with OpsinSession():
+            py2opsin("ethane")  # starts OPSIN
+            py2opsin("water")  # reuses the running OPSIN
+
+    CML output is a single document rather than one line per name, so it
+    cannot be streamed and py2opsin() will launch OPSIN as usual for it.
+
+    With n_workers greater than one, that many OPSIN processes are started per
+    combination of options and lists are split across them, see OpsinPool.
+
+    Args:
+        jar_fpath (str, optional): Filepath to OPSIN jar file. Defaults to "default", which causes py2opsin to use its included jar.
+        n_workers (int, optional): Number of OPSIN processes to run per combination of options. Defaults to 1.
+    """
+
+    def __init__(self, jar_fpath: str = "default", n_workers: int = 1):
+        if n_workers < 1:
+            raise RuntimeError(
+                "n_workers must be at least 1, got {}.".format(n_workers)
+            )
+        self.jar_fpath = jar_fpath
+        self.n_workers = n_workers
+        self._workers = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._next = itertools.count()
+        self._warm_up = None
+
+    def _pool(self, arg_list: list) -> list:
+        key = tuple(arg_list)
+        with self._lock:
+            if key not in self._workers:
+                self._workers[key] = [
+                    OpsinWorker(arg_list) for _ in range(self.n_workers)
+                ]
+            return self._workers[key]
+
+    def _dispatch(
+        self,
+        workers: list,
+        names: list,
+        timeout: float = None,
+        name_timeout: float = None,
+    ) -> list:
+        """Split names into contiguous shards, one per worker, preserving order."""
+        # rotate the starting worker so small concurrent calls spread out
+        offset = next(self._next) % len(workers)
+        workers = workers[offset:] + workers[:offset]
+        n_shards = max(min(len(workers), len(names)), 1)
+        if n_shards == 1:
+            return workers[0].convert(names, timeout, name_timeout)
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.n_workers)
+        size = -(-len(names) // n_shards)
+        starts = list(range(0, len(names), size))
+        shards = [
+            names[start:end] for start, end in zip(starts, starts[1:] + [len(names)])
+        ]
+        futures = [
+            self._executor.submit(bind(worker.convert), shard, timeout, name_timeout)
+            for worker, shard in zip(workers, shards)
+        ]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def _arg_list(
+        self,
+        output_format: str,
+        allow_acid: bool,
+        allow_radicals: bool,
+        allow_bad_stereo: bool,
+        wildcard_radicals: bool,
+    ) -> list:
+        if output_format == "CML":
+            raise RuntimeError(
+                "CML output cannot be streamed through an OpsinSession, call py2opsin outside of the session instead."
+            )
+        return build_arg_list(
+            output_format,
+            allow_acid,
+            allow_radicals,
+            allow_bad_stereo,
+            wildcard_radicals,
+            self.jar_fpath,
+        )
+
+    def start(
+        self,
+        output_format: Literal[
+            "SMILES",
+            "ExtendedSMILES",
+            "InChI",
+            "StdInChI",
+            "StdInChIKey",
+        ] = "SMILES",
+        allow_acid: bool = False,
+        allow_radicals: bool = False,
+        allow_bad_stereo: bool = False,
+        wildcard_radicals: bool = False,
+    ) -> None:
+        """Start OPSIN for the given options ahead of the first conversion.
+
+        Args are the same as for py2opsin().
+        """
+        for worker in self._pool(
+            self._arg_list(
+                output_format,
+                allow_acid,
+                allow_radicals,
+                allow_bad_stereo,
+                wildcard_radicals,
+            )
+        ):
+            worker.start()
+
+    def warm_up(
+        self,
+        chemical_names: list = None,
+        output_format: Literal[
+            "SMILES",
+            "ExtendedSMILES",
+            "InChI",
+            "StdInChI",
+            "StdInChIKey",
+        ] = "SMILES",
+        allow_acid: bool = False,
+        allow_radicals: bool = False,
+        allow_bad_stereo: bool = False,
+        wildcard_radicals: bool = False,
+        min_names: int = 5000,
+        tolerance: float = 0.1,
+        max_seconds: float = 60.0,
+    ) -> WarmUpReport:
+        """Start OPSIN and parse names until it reaches its steady-state speed.
+
+        OPSIN parses slowly until the JVM has compiled its hot paths, so a
+        service can call this before reporting itself ready, and real requests
+        never see the cold start. The corpus is sent through every OPSIN
+        process in rounds until at least min_names have been parsed and a round
+        is no more than tolerance faster than the one before.
+
+        Args:
+            chemical_names (list, optional): Representative names to parse. Defaults to a list shipped with py2opsin.
+            output_format (str, optional): Output format to warm up, as for py2opsin(). Defaults to "SMILES".
+            allow_acid (bool, optional): Allow interpretation of acids. Defaults to False.
+            allow_radicals (bool, optional): Enable radical interpretation. Defaults to False.
+            allow_bad_stereo (bool, optional): Allow OPSIN to ignore uninterpreatable stereochem. Defaults to False.
+            wildcard_radicals (bool, optional): Output radicals as wildcards. Defaults to False.
+            min_names (int, optional): Fewest names to parse, per OPSIN process. Defaults to 5000.
+            tolerance (float, optional): Largest relative speed-up between rounds which counts as steady. Defaults to 0.1.
+            max_seconds (float, optional): Time after which to stop even if still speeding up. Defaults to 60.
+
+        Returns:
+            WarmUpReport: Names parsed, rounds, time taken, final rate, and whether steady state was reached.
+        """
+        names = list(warmup_names() if chemical_names is None else chemical_names)
+        if not names:
+            raise RuntimeError("At least one name is needed to warm up OPSIN.")
+        options = (
+            output_format,
+            allow_acid,
+            allow_radicals,
+            allow_bad_stereo,
+            wildcard_radicals,
+        )
+        start = time.perf_counter()
+        self.start(*options)
+        # rounds long enough to time reliably, with a share for each OPSIN process
+        batch = names * (-(-_WARM_UP_ROUND // len(names)) * self.n_workers)
+        total = rounds = 0
+        rate = previous = None
+        steady = False
+        while True:
+            round_start = time.perf_counter()
+            self._results(batch, *options)
+            rate = len(batch) / max(time.perf_counter() - round_start, 1e-9)
+            total += len(batch)
+            rounds += 1
+            enough = total >= min_names * self.n_workers
+            levelled = previous is not None and rate <= previous * (1 + tolerance)
+            if enough and levelled:
+                steady = True
+                break
+            if time.perf_counter() - start >= max_seconds:
+                break
+            previous = rate
+        self._warm_up = WarmUpReport(
+            total, rounds, time.perf_counter() - start, rate, steady
+        )
+        return self._warm_up
+
+    @property
+    def ready(self) -> bool:
+        """True once warm_up() has brought OPSIN to its steady-state speed."""
+        return self._warm_up is not None and self._warm_up.steady
+
+    def convert(
+        self,
+        chemical_name: Union[str, list],
+        output_format: Literal[
+            "SMILES",
+            "ExtendedSMILES",
+            "InChI",
+            "StdInChI",
+            "StdInChIKey",
+        ] = "SMILES",
+        allow_acid: bool = False,
+        allow_radicals: bool = False,
+        allow_bad_stereo: bool = False,
+        wildcard_radicals: bool = False,
+        return_failures: bool = False,
+        timeout: float = None,
+        name_timeout: float = None,
+    ) -> Union[str, list]:
+        """Translate names with the running OPSIN, starting it if needed.
+
+        Args are the same as for py2opsin().
+
+        Returns:
+            str: Species in requested format, or empty string if it could not be parsed. List of strings if input is list.
+        """
+        if isinstance(chemical_name, str):
+            chemical_name = str(chemical_name)
+        names = [chemical_name] if type(chemical_name) is str else list(chemical_name)
+        with recording("OpsinSession.convert", len(names)):
+            results = self._results(
+                names,
+                output_format,
+                allow_acid,
+                allow_radicals,
+                allow_bad_stereo,
+                wildcard_radicals,
+                timeout=timeout,
+                name_timeout=name_timeout,
+            )
+
+            outputs = finish_results(names, results, return_failures)
+        return outputs[0] if type(chemical_name) is str else outputs
+
+    def _results(
+        self,
+        names: list,
+        output_format: str,
+        allow_acid: bool,
+        allow_radicals: bool,
+        allow_bad_stereo: bool,
+        wildcard_radicals: bool,
+        timeout: float = None,
+        name_timeout: float = None,
+    ) -> list:
+        """One (output, message) pair per name, message being None on success."""
+        workers = self._pool(
+            self._arg_list(
+                output_format,
+                allow_acid,
+                allow_radicals,
+                allow_bad_stereo,
+                wildcard_radicals,
+            )
+        )
+        return self._dispatch(workers, names, timeout, name_timeout)
+
+    def close(self) -> None:
+        """Stop every OPSIN process this session started."""
+        with self._lock:
+            pools, self._workers = list(self._workers.values()), {}
+            executor, self._executor = self._executor, None
+            self._warm_up = None
+        if executor is not None:
+            executor.shutdown()
+        for worker in itertools.chain.from_iterable(pools):
+            worker.close()
+
+    def __enter__(self):
+        enter_session(_ACTIVE_SESSIONS, self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        exit_session(_ACTIVE_SESSIONS, self)
+        self.close()
+
+
+class OpsinPool(OpsinSession):
+    """OpsinSession which spreads lists over several OPSIN processes at once.
+
+    Lists are cut into one contiguous shard per process, converted in
+    parallel, and stitched back together in the original order, so results
+    are the same as from py2opsin(). OPSIN is itself multi-threaded, so a few
+    processes are usually enough to keep every core busy.
+
+    Args:
+        n_workers (int, optional): Number of OPSIN processes to run per combination of options. Defaults to os.cpu_count().
+        jar_fpath (str, optional): Filepath to OPSIN jar file. Defaults to "default", which causes py2opsin to use its included jar.
+    """
+
+    def __init__(self, n_workers: int = None, jar_fpath: str = "default"):
+        super().__init__(
+            jar_fpath=jar_fpath, n_workers=n_workers or os.cpu_count() or 1
+        )
@@ -0,0 +1,210 @@
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+
+# callables given a CallStats after every instrumented call
+_HOOKS = []
+
+# the CallStats being filled in by the current thread, if any
+_local = threading.local()
+
+
+class CallStats:
+    """Measurements from one call to py2opsin() or OpsinSession.convert().
+
+    Stage timings are keyed on "prefilter" (screening out inputs which are not
+    names), "cache" (cache lookups and write-back), "daemon" (asking a running
+    py2opsin daemon, including the conversion it does), "write" (encoding and
+    sending input), "opsin" (waiting on OPSIN, which includes JVM startup when
+    a process is launched), "decode" (splitting OPSIN's output), "retry"
+    (sending failed names again with retry_flags), and "warnings" (formatting
+    warnings). When an OpsinPool splits a list, stage
+    times from its workers are added together and can exceed the wall time.
+
+    Attributes:
+        entry (str): Name of the function which was called.
+        names (int): Number of names given.
+        failures (int): Number of names which could not be parsed.
+        seconds (float): Wall time of the whole call.
+        stages (dict): Seconds spent in each stage.
+        bytes_in (int): Bytes of input sent to OPSIN.
+        bytes_out (int): Bytes of output read back from OPSIN.
+        spawns (int): Number of OPSIN processes launched.
+    """
+
+    def __init__(self, entry: str, names: int):
+        self.entry = entry
+        self.names = names
+        self.failures = 0
+        self.seconds = 0.0
+        self.stages = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.spawns = 0
+        self._lock = threading.Lock()
+
+    @property
+    def names_per_second(self) -> float:
+        return self.names / self.seconds if self.seconds else 0.0
+
+    def _add(self, field: str, amount) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def _add_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def __repr__(self):
+        return (
+            "CallStats(entry={!r}, names={}, failures={}, seconds={:.6f}, stages={!r}, "
+            "bytes_in={}, bytes_out={}, spawns={})".format(
+                self.entry,
+                self.names,
+                self.failures,
+                self.seconds,
+                self.stages,
+                self.bytes_in,
+                self.bytes_out,
+                self.spawns,
+            )
+        )
+
+
+class OpsinStats:
+    """Running totals over every instrumented call, for exporting as metrics.
+
+    Collects only while entered as a context manager or registered with
+    add_stats_hook(). When nothing is collecting, instrumentation is skipped
+    entirely.
+
+        with OpsinStats() as stats:
+            py2opsin(names)
+        stats.snapshot()["names_per_second"]
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __call__(self, call: CallStats) -> None:
+        with self._lock:
+            self.calls += 1
+            self.names += call.names
+            self.failures += call.failures
+            self.seconds += call.seconds
+            self.bytes_in += call.bytes_in
+            self.bytes_out += call.bytes_out
+            self.spawns += call.spawns
+            for stage, seconds in call.stages.items():
+                self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def reset(self) -> None:
+        """Zero every total."""
+        with self._lock:
+            self.calls = self.names = self.failures = 0
+            self.bytes_in = self.bytes_out = self.spawns = 0
+            self.seconds = 0.0
+            self.stages = {}
+
+    def snapshot(self) -> dict:
+        """Copy of the totals, plus the overall names per second."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "names": self.names,
+                "failures": self.failures,
+                "seconds": self.seconds,
+                "names_per_second": self.names / self.seconds if self.seconds else 0.0,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "spawns": self.spawns,
+                "stages": dict(self.stages),
+            }
+
+    def __enter__(self):
+        add_stats_hook(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        remove_stats_hook(self)
+
+
+def add_stats_hook(hook) -> None:
+    """Call hook with a CallStats after every call to py2opsin() or OpsinSession.convert().
+
+    Args:
+        hook (callable): Function taking a single CallStats, e.g. an OpsinStats.
+    """
+    _HOOKS.append(hook)
+
+
+def remove_stats_hook(hook) -> None:
+    """Stop calling a hook registered with add_stats_hook()."""
+    _HOOKS.remove(hook)
+
+
+def current():
+    """CallStats being recorded by this thread, or None."""
+    return getattr(_local, "call", None)
+
+
+@contextmanager
+def recording(entry: str, names: int):
+    """Record a CallStats for the enclosed call and hand it to every hook.
+
+    Does nothing if there are no hooks, or if an outer call is already recording.
+    """
+    if not _HOOKS or current() is not None:
+        yield
+        return
+    call = _local.call = CallStats(entry, names)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        call.seconds = time.perf_counter() - start
+        _local.call = None
+        for hook in list(_HOOKS):
+            try:
+                hook(call)
+            except Exception as e:
+                warnings.warn("py2opsin stats hook raised " + repr(e), RuntimeWarning)
+
+
+@contextmanager
+def stage(name: str):
+    """Add the time spent in the enclosed block to the current call's stage."""
+    call = current()
+    if call is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        call._add_stage(name, time.perf_counter() - start)
+
+
+def count(field: str, amount=1) -> None:
+    """Add to one of the current call's counters, if recording."""
+    call = current()
+    if call is not None:
+        call._add(field, amount)
+
+
+def bind(function):
+    """Wrap function so it records into this thread's call when run on another thread."""
+    call = current()
+    if call is None:
+        return function
+
+    def bound(*args, **kwargs):
+        _local.call = call
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _local.call = None
+
+    return bound
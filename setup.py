@@ -38,9 +38,16 @@ setup(
     classifiers=["Programming Language :: Python :: 3"],
     python_requires=">=3.7",
     install_requires=["typing_extensions; python_version<'3.8'"],
-    extras_require={"dev": ["pubchempy", "black", "pytest", "isort"]},
+    extras_require={"dev": ["black", "pytest", "isort"]},
     packages=find_packages(
         exclude=["test*", "docs*", "examples*"], include=["py2opsin*"]
     ),
     include_package_data=True,
+    entry_points={
+        "console_scripts": [
+            "py2opsin-convert=py2opsin.bulk:main",
+            "py2opsin-daemon=py2opsin.daemon:main",
+            "py2opsin-index=py2opsin.index:main",
+        ]
+    },
 )
@@ -0,0 +1,5 @@
+import os
+
+# tests start their own OPSIN, or their own daemon, rather than using one
+# which happens to be running on this machine
+os.environ["PY2OPSIN_DAEMON"] = ""
@@ -0,0 +1,249 @@
+"""Offline benchmarks for py2opsin.
+
+Run from the repository root with:
+
+    python -m test.benchmark --output bench.json
+
+and compare against the results from another version with:
+
+    python -m test.benchmark --compare old_bench.json
+
+Nothing here touches the network, so results depend only on py2opsin, OPSIN,
+Java, and the machine running them.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+
+try:
+    import resource
+except ImportError:
+    # not available on windows
+    resource = None
+
+import py2opsin as py2opsin_module
+from py2opsin import OpsinPool, OpsinSession, check_java, py2opsin
+
+# always time OPSIN launched here, never a py2opsin daemon which happens to be running
+os.environ["PY2OPSIN_DAEMON"] = ""
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# metrics where a bigger number is better, all others are better smaller
+HIGHER_IS_BETTER = ("names_per_second",)
+
+
+def compound_list() -> list:
+    """Molecules taken from the IUPAC Dissociation Constants dataset
+
+    https://zenodo.org/record/7236453
+    """
+    with open(os.path.join(DATA_DIR, "compound_list.txt")) as file:
+        return file.read().splitlines()
+
+
+def synthetic_names(n: int, seed: int = 0) -> list:
+    """Reproducible list of n substituted ring names, some of which will not parse."""
+    rng = random.Random(seed)
+    substituents = [
+        "methyl",
+        "ethyl",
+        "propyl",
+        "chloro",
+        "bromo",
+        "fluoro",
+        "hydroxy",
+        "amino",
+        "nitro",
+        "methoxy",
+    ]
+    parents = ["benzene", "pyridine", "cyclohexane", "naphthalene", "quinoline"]
+    names = []
+    for _ in range(n):
+        first, second = rng.sample(substituents, 2)
+        locants = sorted(rng.sample(range(1, 7), 2))
+        names.append(
+            "{:d}-{:s}-{:d}-{:s}{:s}".format(
+                locants[0], first, locants[1], second, rng.choice(parents)
+            )
+        )
+    return names
+
+
+def _timed(function, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def _child_peak_rss_mb():
+    """Largest resident set of any finished child process, i.e. OPSIN, in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # linux reports kilobytes, macos bytes
+    return peak / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+def bench_cold_start(repeats: int) -> dict:
+    """Single name through a freshly launched OPSIN, i.e. JVM startup included."""
+    times = [_timed(py2opsin, "ethane") for _ in range(repeats)]
+    return {"median_seconds": statistics.median(times), "min_seconds": min(times)}
+
+
+def bench_warm_single(repeats: int) -> dict:
+    """Single names through an OpsinSession which is already running."""
+    names = compound_list()
+    with OpsinSession() as session:
+        session.convert(names, return_failures=True)
+        times = sorted(
+            _timed(session.convert, names[i % len(names)], return_failures=True)
+            for i in range(repeats)
+        )
+    return {
+        "median_seconds": statistics.median(times),
+        "p95_seconds": times[int(0.95 * (len(times) - 1))],
+    }
+
+
+def bench_batch(names: list) -> dict:
+    """One list through a fresh OPSIN, recording throughput and peak Python memory."""
+    tracemalloc.start()
+    elapsed = _timed(py2opsin, names, return_failures=True)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": elapsed,
+        "names_per_second": len(names) / elapsed,
+        "python_peak_mb": peak / 1024**2,
+    }
+
+
+def bench_scaling(size: int, worker_counts: list) -> dict:
+    """Throughput of a warm OpsinPool as workers are added."""
+    names = synthetic_names(size)
+    results = {}
+    for n_workers in worker_counts:
+        with OpsinPool(n_workers=n_workers) as pool:
+            # every worker should be warm before timing
+            pool.convert(compound_list() * n_workers, return_failures=True)
+            elapsed = _timed(pool.convert, names, return_failures=True)
+        results["workers_{:d}".format(n_workers)] = {
+            "seconds": elapsed,
+            "names_per_second": size / elapsed,
+        }
+    return results
+
+
+def run(sizes: list, worker_counts: list, repeats: int) -> dict:
+    """Run every benchmark, returning results suitable for json."""
+    results = {
+        "cold_start": bench_cold_start(repeats),
+        "warm_single": bench_warm_single(repeats * 20),
+        "batch_compound_list": bench_batch(compound_list()),
+    }
+    for size in sizes:
+        results["batch_{:d}".format(size)] = bench_batch(synthetic_names(size))
+    for name, metrics in bench_scaling(max(sizes), worker_counts).items():
+        results["scaling_" + name] = metrics
+    results["opsin_peak_rss_mb"] = {"megabytes": _child_peak_rss_mb()}
+    return {
+        "py2opsin_version": py2opsin_module.__version__,
+        "java_version": check_java(),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def compare(new: dict, old: dict, tolerance: float) -> list:
+    """Print each metric beside its old value, returning those which regressed."""
+    regressions = []
+    for bench, metrics in new["results"].items():
+        for metric, value in metrics.items():
+            try:
+                before = old["results"][bench][metric]
+            except KeyError:
+                continue
+            if not value or not before:
+                continue
+            ratio = value / before
+            worse = (
+                ratio < 1 - tolerance
+                if metric in HIGHER_IS_BETTER
+                else ratio > 1 + tolerance
+            )
+            print(
+                "{:<28s} {:<18s} {:>12.4g} -> {:>12.4g} ({:+.1%}){:s}".format(
+                    bench,
+                    metric,
+                    before,
+                    value,
+                    ratio - 1,
+                    "  REGRESSION" if worse else "",
+                )
+            )
+            if worse:
+                regressions.append((bench, metric))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write results to this json file")
+    parser.add_argument(
+        "--compare", help="json file from a previous run to compare against"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000],
+        help="batch sizes to measure throughput at",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="OpsinPool sizes to measure scaling at",
+    )
+    parser.add_argument("--repeats", type=int, default=3, help="cold starts to time")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="fractional slowdown allowed before --compare reports a regression",
+    )
+    args = parser.parse_args(argv)
+
+    # failures are expected in the synthetic names and are not what is measured
+    warnings.simplefilter("ignore", RuntimeWarning)
+    new = run(args.sizes, args.workers, args.repeats)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(new, file, indent=2)
+    else:
+        json.dump(new, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as file:
+            old = json.load(file)
+        if compare(new, old, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
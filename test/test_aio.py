@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import unittest
+
+from py2opsin import AsyncOpsinSession, py2opsin_async
+from py2opsin.aio import _ACTIVE_ASYNC_SESSIONS, _AsyncOpsinWorker
+
+from .test_session import NOISY_OPSIN
+
+
+class Test_py2opsin_async(unittest.TestCase):
+    """
+    Test the asyncio interface to OPSIN.
+    """
+
+    def test_single_call(self):
+        """A lone coroutine call should start and stop its own OPSIN."""
+        self.assertEqual(asyncio.run(py2opsin_async("ethane")), "CC")
+        self.assertEqual(asyncio.run(py2opsin_async(["ethane", "water"])), ["CC", "O"])
+
+    def test_concurrent_callers(self):
+        """Concurrent callers should share one OPSIN and each get their own answer."""
+
+        async def lookup():
+            async with AsyncOpsinSession() as session:
+                results = await asyncio.gather(
+                    py2opsin_async("ethane"),
+                    py2opsin_async(["water", "methane"]),
+                    session.convert("water", output_format="StdInChIKey"),
+                )
+                return results, len(session._workers)
+
+        results, n_workers = asyncio.run(lookup())
+        self.assertEqual(results, ["CC", ["O", "C"], "XLYOFNOQVPJJNP-UHFFFAOYSA-N"])
+        self.assertEqual(n_workers, 2)
+
+    def test_failures(self):
+        """Names OPSIN cannot parse come back empty with a warning."""
+        with self.assertWarns(RuntimeWarning):
+            result = asyncio.run(py2opsin_async(["blah", "", "water"]))
+        self.assertEqual(result, ["", "", "O"])
+
+    def test_jvm_stderr_ignored(self):
+        """Lines the JVM writes to stderr should not be taken for OPSIN's messages."""
+
+        async def lookup():
+            worker = _AsyncOpsinWorker(NOISY_OPSIN, batch_window=0.002)
+            try:
+                return await worker.convert(["bad1", "ok", "bad2"])
+            finally:
+                await worker.close()
+
+        self.assertEqual(
+            asyncio.run(lookup()),
+            [("", "bad1 is unparsable"), ("ok", None), ("", "bad2 is unparsable")],
+        )
+
+    def test_large_batch(self):
+        """A list much larger than the pipe's buffer should be written and answered in full."""
+        names = ["ok{:d}".format(i) for i in range(50000)]
+
+        async def lookup():
+            worker = _AsyncOpsinWorker(NOISY_OPSIN, batch_window=0.002)
+            try:
+                return await worker.convert(names)
+            finally:
+                await worker.close()
+
+        self.assertEqual(asyncio.run(lookup()), [(name, None) for name in names])
+
+    def test_session_per_loop(self):
+        """A session entered in one event loop should not be used by another."""
+        seen = []
+
+        async def other_loop():
+            seen.append(_ACTIVE_ASYNC_SESSIONS.get())
+
+        async def lookup():
+            async with AsyncOpsinSession() as session:
+                thread = threading.Thread(target=lambda: asyncio.run(other_loop()))
+                thread.start()
+                thread.join()
+                return _ACTIVE_ASYNC_SESSIONS.get() == (session,)
+
+        self.assertTrue(asyncio.run(lookup()))
+        self.assertEqual(seen, [()])
+
+    def test_cancelled_caller(self):
+        """A cancelled caller should not disturb the answers of later callers."""
+
+        async def lookup():
+            async with AsyncOpsinSession() as session:
+                task = asyncio.ensure_future(session.convert(["ethane"] * 50))
+                await asyncio.sleep(0)
+                task.cancel()
+                return await session.convert(["water", "methane"])
+
+        self.assertEqual(asyncio.run(lookup()), ["O", "C"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from py2opsin import OpsinSession, convert_file
+from py2opsin.bulk import main
+
+
+class Test_convert_file(unittest.TestCase):
+    """
+    Test file to file conversion.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.output = os.path.join(self.tmpdir, "out.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, fname: str, text: str) -> str:
+        fpath = os.path.join(self.tmpdir, fname)
+        with open(fpath, "w", newline="") as file:
+            file.write(text)
+        return fpath
+
+    def _read(self) -> list:
+        with open(self.output, newline="") as file:
+            return list(csv.reader(file))
+
+    def test_name_list(self):
+        """A plain list of names should come back with a result and error column."""
+        names = self._write("names.txt", "ethane\nbad_name\nwater\n")
+        summary = convert_file(names, self.output, chunk_size=2)
+        self.assertEqual(summary.rows, 3)
+        self.assertEqual(summary.failures, 1)
+        rows = self._read()
+        self.assertEqual(rows[0], ["name", "SMILES", "error"])
+        self.assertEqual(rows[1], ["ethane", "CC", ""])
+        self.assertEqual(rows[2][:2], ["bad_name", ""])
+        self.assertTrue(rows[2][2])
+        self.assertEqual(rows[3], ["water", "O", ""])
+        self.assertFalse(os.path.exists(self.output + ".checkpoint"))
+
+    def test_csv_column(self):
+        """Rows of a delimited file should be copied with the result appended."""
+        table = self._write(
+            "table.csv", 'id,compound\n1,ethane\n2,"water"\n3,methanol\n'
+        )
+        convert_file(table, self.output, column="compound")
+        self.assertEqual(
+            self._read(),
+            [
+                ["id", "compound", "SMILES", "error"],
+                ["1", "ethane", "CC", ""],
+                ["2", "water", "O", ""],
+                ["3", "methanol", "CO", ""],
+            ],
+        )
+
+    def test_missing_column(self):
+        """Asking for a column which is not in the header should raise an error."""
+        table = self._write("table.csv", "id,compound\n1,ethane\n")
+        with self.assertRaises(RuntimeError):
+            convert_file(table, self.output, column="name")
+
+    def test_resume(self):
+        """An interrupted run should pick up after the last completed chunk."""
+        names = self._write("names.txt", "ethane\nwater\nmethanol\nethanol\nmethane\n")
+        results = OpsinSession._results
+        calls = []
+
+        def interrupt(session, *args):
+            calls.append(args[0])
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return results(session, *args)
+
+        def record(session, *args):
+            calls.append(args[0])
+            return results(session, *args)
+
+        with mock.patch.object(OpsinSession, "_results", interrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                convert_file(names, self.output, chunk_size=2)
+        self.assertTrue(os.path.exists(self.output + ".checkpoint"))
+
+        calls.clear()
+        with mock.patch.object(OpsinSession, "_results", record):
+            summary = convert_file(names, self.output, chunk_size=2, resume=True)
+        # the first chunk was not converted again
+        self.assertEqual(calls[0], ["methanol", "ethanol"])
+        self.assertEqual(summary.rows, 5)
+        self.assertEqual(
+            [row[:2] for row in self._read()],
+            [
+                ["name", "SMILES"],
+                ["ethane", "CC"],
+                ["water", "O"],
+                ["methanol", "CO"],
+                ["ethanol", "C(C)O"],
+                ["methane", "C"],
+            ],
+        )
+
+    def test_main(self):
+        """The console script should convert a file with the given options."""
+        table = self._write("table.tsv", "compound\nethane\n")
+        main([table, self.output, "--column", "compound", "--delimiter", "\t"])
+        with open(self.output, newline="") as file:
+            self.assertEqual(
+                list(csv.reader(file, delimiter="\t")),
+                [["compound", "SMILES", "error"], ["ethane", "CC", ""]],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+
+from py2opsin import OpsinCache, OpsinDiskCache, OpsinSession, py2opsin
+
+
+# multiprocessing test function
+def _put(b):
+    cache = OpsinDiskCache(b[0])
+    cache.put_many(
+        {(name, "SMILES", ("jar", None, None)): (name, None) for name in b[1]}
+    )
+
+
+class Test_OpsinCache(unittest.TestCase):
+    """
+    Test memoizing OPSIN results.
+    """
+
+    def test_lru_eviction(self):
+        """The least recently used entry should be evicted first."""
+        cache = OpsinCache(maxsize=2)
+        cache.put_many({"a": ("A", None), "b": ("B", None)})
+        cache.get_many(["a"])
+        cache.put_many({"c": ("C", None)})
+        self.assertEqual(
+            cache.get_many(["a", "b", "c"]), {"a": ("A", None), "c": ("C", None)}
+        )
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.evictions), (3, 1, 1))
+        self.assertEqual((info.maxsize, info.currsize), (2, 2))
+
+    def test_invalid_maxsize(self):
+        """A cache which can hold nothing is a mistake."""
+        with self.assertRaises(RuntimeError):
+            OpsinCache(maxsize=0)
+
+    def test_py2opsin_cache(self):
+        """Repeated names should be answered from the cache."""
+        cache = OpsinCache()
+        self.assertEqual(
+            py2opsin(["ethane", "water", "ethane"], cache=cache), ["CC", "O", "CC"]
+        )
+        self.assertEqual(cache.cache_info().misses, 2)
+        self.assertEqual(py2opsin("water", cache=cache), "O")
+        self.assertEqual(cache.cache_info().hits, 1)
+
+        # different options are a different result
+        self.assertEqual(
+            py2opsin("water", output_format="StdInChIKey", cache=cache),
+            "XLYOFNOQVPJJNP-UHFFFAOYSA-N",
+        )
+        self.assertEqual(cache.cache_info().misses, 3)
+
+    def test_cached_failures_warn(self):
+        """Failed names are cached but should still warn every time."""
+        cache = OpsinCache()
+        with OpsinSession():
+            for _ in range(2):
+                with self.assertWarns(RuntimeWarning):
+                    self.assertEqual(
+                        py2opsin(["blah", "water"], cache=cache), ["", "O"]
+                    )
+        self.assertEqual(cache.cache_info().hits, 2)
+
+
+class Test_OpsinDiskCache(unittest.TestCase):
+    """
+    Test the persistent SQLite cache.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fpath = os.path.join(self.tmpdir.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_persists(self):
+        """Results should be visible to a new cache opened on the same file."""
+        key = ("water", "SMILES", False, ("jar", None, None))
+        OpsinDiskCache(self.fpath).put_many({key: ("O", None)})
+        cache = OpsinDiskCache(self.fpath)
+        self.assertEqual(cache.get_many([key]), {key: ("O", None)})
+        other = ("water", "StdInChIKey", False, ("jar", None, None))
+        self.assertEqual(cache.get_many([other]), {})
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 1, 1))
+
+    def test_eviction(self):
+        """The least recently used entries should be deleted past max_entries."""
+        cache = OpsinDiskCache(self.fpath, max_entries=2)
+        keys = [(name, "SMILES", ("jar", None, None)) for name in "abc"]
+        cache.put_many({keys[0]: ("A", None), keys[1]: ("B", None)})
+        cache.get_many([keys[0]])
+        cache.put_many({keys[2]: ("C", None)})
+        self.assertEqual(set(cache.get_many(keys)), {keys[0], keys[2]})
+        self.assertEqual(cache.cache_info().evictions, 1)
+
+    def test_running_size(self):
+        """The row count should follow replaced and cleared entries."""
+        cache = OpsinDiskCache(self.fpath)
+        key = ("water", "SMILES", ("jar", None, None))
+        cache.put_many({key: ("O", None)})
+        cache.put_many({key: ("O", None)})
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(len(OpsinDiskCache(self.fpath)), 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_lookups_do_not_write(self):
+        """Hits should only be recorded in the database along with the next results stored."""
+        cache = OpsinDiskCache(self.fpath)
+        key = ("water", "SMILES", ("jar", None, None))
+        cache.put_many({key: ("O", None)})
+        db = cache._connection()
+        (stored,) = db.execute("SELECT last_used FROM results").fetchone()
+        time.sleep(0.05)
+        cache.get_many([key])
+        self.assertEqual(
+            db.execute("SELECT last_used FROM results").fetchone()[0], stored
+        )
+        cache.put_many({})
+        self.assertGreater(
+            db.execute("SELECT last_used FROM results").fetchone()[0], stored
+        )
+
+    def test_concurrent_writers(self):
+        """Several processes should be able to write to the cache at once."""
+        batches = [
+            (self.fpath, [str(i) + "-" + str(j) for j in range(200)]) for i in range(4)
+        ]
+        OpsinDiskCache(self.fpath)
+        with multiprocessing.Pool(4) as pool:
+            pool.map(_put, batches)
+        self.assertEqual(len(OpsinDiskCache(self.fpath)), 800)
+
+    def test_py2opsin_disk_cache(self):
+        """py2opsin should answer from the disk cache across instances."""
+        self.assertEqual(py2opsin("ethane", cache=OpsinDiskCache(self.fpath)), "CC")
+        cache = OpsinDiskCache(self.fpath)
+        self.assertEqual(py2opsin(["ethane"], cache=cache), ["CC"])
+        self.assertEqual(cache.cache_info().hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
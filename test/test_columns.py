@@ -0,0 +1,82 @@
+import importlib.util
+import unittest
+
+from py2opsin import ParseFailure, py2opsin
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+HAS_PANDAS = importlib.util.find_spec("pandas") is not None
+
+
+class Test_columns(unittest.TestCase):
+    """
+    Test converting pandas and NumPy columns of names.
+    """
+
+    @unittest.skipUnless(HAS_PANDAS, "pandas is not installed")
+    def test_series(self):
+        """Results should line up with the input's index, with nulls left as None."""
+        import pandas as pd
+
+        names = pd.Series(
+            ["ethane", None, "water", float("nan"), "ethane"],
+            index=[10, 11, 12, 13, 14],
+        )
+        smiles = py2opsin(names)
+        self.assertIsInstance(smiles, pd.Series)
+        self.assertEqual(list(smiles.index), [10, 11, 12, 13, 14])
+        self.assertEqual(smiles.tolist(), ["CC", None, "O", None, "CC"])
+
+    @unittest.skipUnless(HAS_PANDAS, "pandas is not installed")
+    def test_series_multiple_formats(self):
+        """A list of formats should give a DataFrame with a column for each."""
+        import pandas as pd
+
+        names = pd.Series(["ethane", pd.NA], index=["a", "b"])
+        frame = py2opsin(names, ["SMILES", "StdInChIKey"])
+        self.assertIsInstance(frame, pd.DataFrame)
+        self.assertEqual(list(frame.columns), ["SMILES", "StdInChIKey"])
+        self.assertEqual(list(frame.index), ["a", "b"])
+        self.assertEqual(frame.loc["a", "SMILES"], "CC")
+        self.assertIsNone(frame.loc["b", "SMILES"])
+
+    @unittest.skipUnless(HAS_PANDAS, "pandas is not installed")
+    def test_dataframe(self):
+        """A whole DataFrame is ambiguous and should raise an error."""
+        import pandas as pd
+
+        with self.assertRaises(RuntimeError):
+            py2opsin(pd.DataFrame({"name": ["ethane"]}))
+
+    def test_str_subclass(self):
+        """A subclass of str should be converted as one name, not a list of characters."""
+
+        class Name(str):
+            pass
+
+        self.assertEqual(py2opsin(Name("ethane")), "CC")
+
+    @unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+    def test_numpy_scalar(self):
+        """A NumPy string scalar should be converted like a str."""
+        import numpy as np
+
+        self.assertEqual(py2opsin(np.str_("ethane")), "CC")
+        self.assertEqual(py2opsin(np.array(["ethane"])[0]), "CC")
+
+    @unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+    def test_array(self):
+        """NumPy arrays should give an object array of the same length."""
+        import numpy as np
+
+        smiles = py2opsin(
+            np.array(["ethane", "blah", "water"], dtype=object), return_failures=True
+        )
+        self.assertIsInstance(smiles, np.ndarray)
+        self.assertEqual(smiles.shape, (3,))
+        self.assertEqual(smiles[0], "CC")
+        self.assertIsInstance(smiles[1], ParseFailure)
+        self.assertEqual(smiles[2], "O")
+
+
+if __name__ == "__main__":
+    unittest.main()
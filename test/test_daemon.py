@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+import warnings
+from unittest import mock
+
+from py2opsin import OpsinDaemon, OpsinStats, py2opsin
+
+
+class Test_OpsinDaemon(unittest.TestCase):
+    """
+    Test serving conversions to py2opsin from a shared daemon.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.address = os.path.join(self.tmp_dir.name, "daemon.sock")
+        self.names = ["ethane", "water", "bad_name"]
+        with mock.patch.dict(os.environ, {"PY2OPSIN_DAEMON": ""}):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                self.expected = py2opsin(self.names)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_uses_daemon(self):
+        """A reachable daemon should convert names without the caller starting Java."""
+        with OpsinDaemon(self.address) as daemon:
+            daemon.start()
+            daemon.session.start()
+            with mock.patch.dict(os.environ, {"PY2OPSIN_DAEMON": self.address}):
+                with OpsinStats() as stats, warnings.catch_warnings():
+                    warnings.simplefilter("ignore", RuntimeWarning)
+                    results = py2opsin(self.names)
+        self.assertEqual(results, self.expected)
+        totals = stats.snapshot()
+        self.assertEqual(totals["spawns"], 0)
+        self.assertIn("daemon", totals["stages"])
+        self.assertFalse(os.path.exists(self.address))
+
+    def test_failures_from_daemon(self):
+        """OPSIN's messages should come back through the daemon."""
+        with OpsinDaemon(self.address) as daemon:
+            daemon.start()
+            with mock.patch.dict(os.environ, {"PY2OPSIN_DAEMON": self.address}):
+                results = py2opsin(self.names, return_failures=True)
+        self.assertEqual(results[2].name, "bad_name")
+
+    def test_fallback(self):
+        """Without a daemon, or with one for another jar, OPSIN should be run locally."""
+        with mock.patch.dict(os.environ, {"PY2OPSIN_DAEMON": self.address}):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                self.assertEqual(py2opsin(self.names), self.expected)
+                with OpsinDaemon(self.address, jar_fpath="other.jar") as daemon:
+                    daemon.start()
+                    self.assertEqual(py2opsin(self.names), self.expected)
+
+    def test_tcp(self):
+        """The daemon should also listen on localhost TCP."""
+        with OpsinDaemon("127.0.0.1:0") as daemon:
+            daemon.start()
+            host, port = daemon._server.server_address
+            address = "{:s}:{:d}".format(host, port)
+            with mock.patch.dict(os.environ, {"PY2OPSIN_DAEMON": address}):
+                with OpsinStats() as stats, warnings.catch_warnings():
+                    warnings.simplefilter("ignore", RuntimeWarning)
+                    results = py2opsin(self.names)
+        self.assertEqual(results, self.expected)
+        self.assertIn("daemon", stats.snapshot()["stages"])
+
+    def test_already_running(self):
+        """A second daemon on the same socket should refuse to start."""
+        with OpsinDaemon(self.address) as daemon:
+            daemon.start()
+            with self.assertRaises(RuntimeError):
+                OpsinDaemon(self.address).start()
+
+
+if __name__ == "__main__":
+    unittest.main()
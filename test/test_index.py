@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+import warnings
+
+from py2opsin import OpsinCache, OpsinIndex, OpsinStats, build_index, py2opsin
+
+
+class Test_OpsinIndex(unittest.TestCase):
+    """
+    Test looking names up in a prebuilt, memory-mapped index.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fpath = os.path.join(self.tmp_dir.name, "names.idx")
+        self.names = ["ethane", "water", "methane"]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            self.n = build_index(self.names + ["bad_name"], self.fpath)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_build(self):
+        """Only names OPSIN could parse in every format should be kept."""
+        self.assertEqual(self.n, 3)
+        with OpsinIndex(self.fpath) as index:
+            self.assertEqual(len(index), 3)
+            self.assertIn("ethane", index)
+            self.assertNotIn("bad_name", index)
+            self.assertEqual(
+                index.lookup("water"),
+                py2opsin("water", ["SMILES", "StdInChI", "StdInChIKey"]),
+            )
+
+    def test_py2opsin_index(self):
+        """Names in the index should be answered without starting Java."""
+        with OpsinIndex(self.fpath) as index:
+            with OpsinStats() as stats:
+                results = py2opsin(self.names, "StdInChIKey", cache=index)
+            self.assertEqual(stats.snapshot()["spawns"], 0)
+            self.assertEqual(results, py2opsin(self.names, "StdInChIKey"))
+            self.assertEqual(index.cache_info().hits, 3)
+            # other flags or formats are not in the index
+            with OpsinStats() as stats:
+                py2opsin(self.names, "InChI", cache=index)
+                py2opsin(self.names, allow_acid=True, cache=index)
+            self.assertEqual(stats.snapshot()["spawns"], 2)
+
+    def test_fallback_cache(self):
+        """Names missing from the index should go to the wrapped cache."""
+        cache = OpsinCache()
+        with OpsinIndex(self.fpath, cache=cache) as index:
+            py2opsin(["ethane", "propane"], cache=index)
+            self.assertEqual(len(cache), 1)
+            with OpsinStats() as stats:
+                py2opsin(["ethane", "propane"], cache=index)
+            self.assertEqual(stats.snapshot()["spawns"], 0)
+
+    def test_extend(self):
+        """Extending should keep existing entries and only convert new names."""
+        with OpsinStats() as stats:
+            n = build_index(["methanol", "ethane"], self.fpath, extend=True)
+        self.assertEqual(n, 4)
+        # the one new name, converted to each of the three formats
+        self.assertEqual(stats.snapshot()["names"], 3)
+        with OpsinIndex(self.fpath) as index:
+            self.assertIn("methanol", index)
+            self.assertIn("methane", index)
+        with self.assertRaises(RuntimeError):
+            build_index(["butane"], self.fpath, ["SMILES"], extend=True)
+
+    def test_not_an_index(self):
+        """Other files should be refused."""
+        fpath = os.path.join(self.tmp_dir.name, "names.txt")
+        with open(fpath, "w") as file:
+            file.write("ethane\n")
+        with self.assertRaises(RuntimeError):
+            OpsinIndex(fpath)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from py2opsin import (
+    check_java,
+    find_java,
+    py2opsin,
+    set_java,
+    set_jvm_options,
+    stop_cds_archive,
+    use_cds_archive,
+)
+from py2opsin._core import build_arg_list
+
+
+class Test_java(unittest.TestCase):
+    """
+    Test locating and checking Java.
+    """
+
+    def tearDown(self):
+        set_java(None)
+        set_jvm_options(None)
+        stop_cds_archive()
+
+    def test_set_java(self):
+        """An explicitly chosen executable should be used as is."""
+        set_java("/not/a/real/java")
+        self.assertEqual(find_java(), "/not/a/real/java")
+        with self.assertRaises(RuntimeError):
+            check_java()
+
+    def test_environment_variable(self):
+        """PY2OPSIN_JAVA should take precedence over JAVA_HOME and the PATH."""
+        with mock.patch.dict(os.environ, {"PY2OPSIN_JAVA": "/opt/java/bin/java"}):
+            set_java(None)
+            self.assertEqual(find_java(), "/opt/java/bin/java")
+
+    def test_check_java(self):
+        """check_java should report the version of a working Java."""
+        self.assertIn("version", check_java())
+
+    def test_jvm_options(self):
+        """JVM options should go between java and -jar, and OPSIN should still run."""
+        set_jvm_options(["-Xmx512m", "-XX:+UseSerialGC"])
+        arg_list = build_arg_list("SMILES", False, False, False, False, "default")
+        self.assertEqual(arg_list[1:4], ["-Xmx512m", "-XX:+UseSerialGC", "-jar"])
+        self.assertEqual(py2opsin("ethane"), "CC")
+
+    def test_jvm_options_environment_variable(self):
+        """PY2OPSIN_JVM_OPTIONS should be used unless set_jvm_options was called."""
+        with mock.patch.dict(os.environ, {"PY2OPSIN_JVM_OPTIONS": "-Xms64m -Xmx1g"}):
+            arg_list = build_arg_list("SMILES", False, False, False, False, "default")
+            self.assertEqual(arg_list[1:3], ["-Xms64m", "-Xmx1g"])
+            set_jvm_options([])
+            arg_list = build_arg_list("SMILES", False, False, False, False, "default")
+            self.assertEqual(arg_list[1], "-jar")
+
+    def test_cds_archive(self):
+        """An existing archive should be passed to every OPSIN launched."""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            archive = os.path.join(tmpdir, "opsin.jsa")
+            open(archive, "w").close()
+            self.assertEqual(use_cds_archive(archive), archive)
+            arg_list = build_arg_list("SMILES", False, False, False, False, "default")
+            self.assertIn("-XX:SharedArchiveFile=" + archive, arg_list)
+            stop_cds_archive()
+            arg_list = build_arg_list("SMILES", False, False, False, False, "default")
+            self.assertNotIn("-XX:SharedArchiveFile=" + archive, arg_list)
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import importlib.util
+import unittest
+from unittest import mock
+
+from py2opsin import OpsinJVMSession, ParseFailure, py2opsin
+
+HAS_JPYPE = importlib.util.find_spec("jpype") is not None
+
+
+class Test_OpsinJVMSession(unittest.TestCase):
+    """
+    Test running OPSIN in process through JPype.
+    """
+
+    def test_matches_subprocess(self):
+        """Results should be the same in process as from a separate OPSIN."""
+        names = ["ethane", "water", "blah", ""]
+        with OpsinJVMSession() as session:
+            self.assertEqual(session.in_process, HAS_JPYPE)
+            results = py2opsin(names, return_failures=True)
+        self.assertEqual(results[:2], py2opsin(names[:2]))
+        self.assertIsInstance(results[2], ParseFailure)
+        self.assertIsInstance(results[3], ParseFailure)
+
+    def test_formats_share_parses(self):
+        """Several output formats should come from one parse of each name in process."""
+        with OpsinJVMSession() as session:
+            # stands in for OPSIN loaded through JPype
+            session._opsin = opsin = mock.MagicMock()
+            records = py2opsin(["ethane", "water"], ["SMILES", "StdInChIKey"])
+            self.assertEqual(len(records), 2)
+            self.assertEqual(opsin.instance.parseChemicalName.call_count, 2)
+            self.assertIsNone(session._parses)
+            py2opsin(["ethane"])
+            self.assertEqual(opsin.instance.parseChemicalName.call_count, 3)
+
+    def test_invalid_format(self):
+        """Bad formats should raise the same error as py2opsin."""
+        with OpsinJVMSession() as session:
+            with self.assertRaises(RuntimeError):
+                session.convert("ethane", output_format="SMOLES")
+            with self.assertRaises(RuntimeError):
+                session.convert("ethane", output_format="CML")
+
+    @unittest.skipIf(HAS_JPYPE, "JPype is installed")
+    def test_no_fallback(self):
+        """Without JPype, fallback=False should raise rather than use a subprocess."""
+        with self.assertRaises(ImportError):
+            OpsinJVMSession(fallback=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from py2opsin import ParseFailure, py2opsin, py2opsin_parallel
+from py2opsin.parallel import _balance
+
+
+class Test_py2opsin_parallel(unittest.TestCase):
+    """
+    Test converting one list with several OPSIN processes.
+    """
+
+    def test_matches_py2opsin(self):
+        """Results should be in the original order whatever the number of processes."""
+        names = ["ethane", "water", "methane", "blah", "methanol", "ethanol"] * 3
+        expected = py2opsin(names, return_failures=True)
+        for processes in (1, 2, 4, 50):
+            self.assertEqual(
+                py2opsin_parallel(names, processes=processes, return_failures=True),
+                expected,
+            )
+
+    def test_failures(self):
+        """Names which cannot be parsed should fail like they do with py2opsin."""
+        results = py2opsin_parallel(["ethane", "blah"], return_failures=True)
+        self.assertEqual(results[0], "CC")
+        self.assertIsInstance(results[1], ParseFailure)
+        with self.assertWarns(RuntimeWarning):
+            self.assertEqual(py2opsin_parallel(["blah"]), [""])
+
+    def test_empty(self):
+        """An empty list should not start OPSIN at all."""
+        self.assertEqual(py2opsin_parallel([]), [])
+
+    def test_invalid(self):
+        """CML and bad process counts should raise before OPSIN is started."""
+        with self.assertRaises(RuntimeError):
+            py2opsin_parallel(["ethane"], output_format="CML")
+        with self.assertRaises(RuntimeError):
+            py2opsin_parallel(["ethane"], processes=0)
+
+    def test_balance(self):
+        """Shards should hold similar amounts of text, in input order."""
+        names = ["a" * 100, "b", "c", "d" * 50, "e" * 50]
+        shards = _balance(names, 2)
+        self.assertEqual(sorted(i for shard in shards for i in shard), list(range(5)))
+        loads = [sum(len(names[i]) for i in shard) for shard in shards]
+        self.assertLessEqual(max(loads) - min(loads), 10)
+        for shard in shards:
+            self.assertEqual(shard, sorted(shard))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import warnings
+
+from py2opsin import OpsinStats, ParseFailure, classify_name, py2opsin
+
+
+class Test_prefilter(unittest.TestCase):
+    """
+    Test skipping inputs which cannot be names before calling OPSIN.
+    """
+
+    def test_classify_name(self):
+        """Inputs should be sorted into the kinds which are not names."""
+        kinds = {
+            "": "empty",
+            "  ": "empty",
+            "N/A": "placeholder",
+            "InChI=1S/H2O/h1H2": "InChI",
+            "XLYOFNOQVPJJNP-UHFFFAOYSA-N": "InChIKey",
+            "64-17-5": "CAS",
+            "CCO": "SMILES",
+            "c1ccccc1": "SMILES",
+            "[Na+].[Cl-]": "SMILES",
+            "AZD9291": "code",
+            "see the supplier's data sheet for details!": "text",
+        }
+        for name, kind in kinds.items():
+            self.assertEqual(classify_name(name), kind, name)
+
+    def test_names_pass(self):
+        """Real names should never be held back."""
+        for name in (
+            "ethane",
+            "ETHANOL",
+            "acetic acid",
+            "sodium chloride",
+            "N,N-dimethylformamide",
+            "(2R,3S)-2,3-dibromobutane",
+            "copper(II) sulfate",
+            "alpha-D-glucopyranose",
+            "9H-fluorene",
+            "ethyl 2-methylpropanoate",
+            "2-{[2-(dimethylamino)ethyl]amino}ethanol",
+            "4-{2-[(4-chlorophenyl)methoxy]ethyl}morpholine",
+            "tricyclo[2.2.1.0^{2,6}]heptane",
+            "N~2~-acetyl-L-lysine",
+            "2,2':6',2\"-terpyridine",
+            "CoCl2",
+        ):
+            self.assertIsNone(classify_name(name), name)
+
+    def test_py2opsin_prefilter(self):
+        """Skipped inputs should fail with a reason, in their original positions."""
+        names = ["ethane", "64-17-5", "water", "", "XLYOFNOQVPJJNP-UHFFFAOYSA-N"]
+        with OpsinStats() as stats:
+            results = py2opsin(names, prefilter=True, return_failures=True)
+        self.assertEqual(results[0:3:2], py2opsin(names[0:3:2]))
+        self.assertIsInstance(results[1], ParseFailure)
+        self.assertIn("CAS", results[1].message)
+        self.assertIsInstance(results[3], ParseFailure)
+        self.assertIsInstance(results[4], ParseFailure)
+        self.assertIn("prefilter", stats.snapshot()["stages"])
+
+    def test_passthrough(self):
+        """Inputs already in the requested format should be returned unchanged."""
+        results = py2opsin(
+            ["XLYOFNOQVPJJNP-UHFFFAOYSA-N", "water"],
+            output_format="StdInChIKey",
+            prefilter=True,
+        )
+        self.assertEqual(results[0], "XLYOFNOQVPJJNP-UHFFFAOYSA-N")
+        self.assertEqual(py2opsin("CCO", prefilter=True), "CCO")
+
+    def test_no_passthrough_for_words(self):
+        """Words which happen to be made of atom symbols should fail rather than be returned as SMILES."""
+        results = py2opsin(
+            ["BOP", "NBS", "Cobb", "c1ccccc1", "CC(=O)O"],
+            prefilter=True,
+            return_failures=True,
+        )
+        for result in results[:3]:
+            self.assertIsInstance(result, ParseFailure)
+            self.assertIn("SMILES", result.message)
+        self.assertEqual(results[3:], ["c1ccccc1", "CC(=O)O"])
+
+    def test_nothing_to_convert(self):
+        """OPSIN should not be started when every input is skipped."""
+        with OpsinStats() as stats, warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            results = py2opsin(["", "64-17-5"], prefilter=True, compact=True)
+        self.assertEqual(list(results), ["", ""])
+        self.assertEqual(stats.snapshot()["spawns"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,14 @@
+import importlib
 import os
 import multiprocessing
 import sys
 import unittest
+from unittest import mock
 
-from py2opsin import py2opsin
+from py2opsin import ParseFailure, py2opsin
+
+# the module, which the package's py2opsin function shadows
+py2opsin_module = importlib.import_module("py2opsin.py2opsin")
 
 
 # multiprocessing test function
@@ -109,6 +114,18 @@ class Test_py2opsin(unittest.TestCase):
             res = pool.map(_f, [("methanol", 0), ("ethanol", 1)])
         self.assertEqual(res, ["CO", "C(C)O"])
 
+    def test_multiprocessing_stdin(self):
+        """Concurrent calls should not need unique temporary files"""
+        with multiprocessing.Pool(2) as pool:
+            res = pool.map(py2opsin, ["methanol", "ethanol"])
+        self.assertEqual(res, ["CO", "C(C)O"])
+
+    def test_no_temp_file(self):
+        """By default input goes over stdin, leaving the working directory alone"""
+        before = set(os.listdir(os.getcwd()))
+        self.assertEqual(py2opsin(["ethane", "water"]), ["CC", "O"])
+        self.assertEqual(set(os.listdir(os.getcwd())), before)
+
     def test_name_to_smiles(self):
         """
         Tests converting IUPAC names to SMILES strings
@@ -204,6 +221,116 @@ class Test_py2opsin(unittest.TestCase):
             smiles_list = py2opsin(list_with_errors)
         self.assertEqual(smiles_list, correct_list)
 
+    def test_multiple_formats(self):
+        """
+        Test requesting several output formats in one call
+        """
+        formats = ["SMILES", "StdInChI", "StdInChIKey"]
+        record = py2opsin("water", output_format=formats)
+        self.assertEqual(
+            record,
+            {
+                "SMILES": "O",
+                "StdInChI": "InChI=1S/H2O/h1H2",
+                "StdInChIKey": "XLYOFNOQVPJJNP-UHFFFAOYSA-N",
+            },
+        )
+
+        records = py2opsin(self.chemical_names, output_format=formats)
+        self.assertEqual(
+            records,
+            [
+                {
+                    "SMILES": test_info["smiles"],
+                    "StdInChI": test_info["stdinchi"],
+                    "StdInChIKey": test_info["stdinchikey"],
+                }
+                for test_info in self.chemical_info
+            ],
+        )
+
+    def test_multiple_formats_invalid(self):
+        """
+        One invalid format in the list should raise before OPSIN is run
+        """
+        with self.assertRaises(RuntimeError):
+            py2opsin("ethane", output_format=["SMILES", "SMOLES"])
+
+    def test_return_failures(self):
+        """
+        Test returning a ParseFailure in place of each name which failed
+        """
+        results = py2opsin(["methane", "blah", "water"], return_failures=True)
+        self.assertEqual(results[0], "C")
+        self.assertIsInstance(results[1], ParseFailure)
+        self.assertEqual(results[1].name, "blah")
+        self.assertIn("blah", results[1].message)
+        self.assertFalse(results[1])
+        self.assertEqual(results[2], "O")
+
+        self.assertIsInstance(py2opsin("blah", return_failures=True), ParseFailure)
+
+    def test_return_failures_cml(self):
+        """
+        CML output cannot be split into per-name failures
+        """
+        with self.assertRaises(RuntimeError):
+            py2opsin("ethane", output_format="CML", return_failures=True)
+
+    def test_chunking(self):
+        """
+        Test that long lists are split into chunks with progress reported after each
+        """
+        names = ["ethane", "water", "methane", "methanol", "ethanol"]
+        for chunk_workers in (1, 2):
+            updates = []
+            results = py2opsin(
+                names,
+                chunk_size=2,
+                chunk_workers=chunk_workers,
+                progress=updates.append,
+            )
+            self.assertEqual(results, py2opsin(names))
+            self.assertEqual(len(updates), 3)
+            self.assertEqual(updates[-1].done, 5)
+            self.assertEqual(updates[-1].total, 5)
+            self.assertEqual(updates[-1].eta, 0)
+
+    def test_chunk_failure(self):
+        """
+        Test that a chunk OPSIN crashes on does not lose the other chunks
+        """
+        opsin_results = py2opsin_module._opsin_results
+
+        def crash(names, *args):
+            return False if "water" in names else opsin_results(names, *args)
+
+        with mock.patch.object(py2opsin_module, "_opsin_results", crash):
+            results = py2opsin(
+                ["ethane", "methane", "water", "methanol"],
+                chunk_size=2,
+                return_failures=True,
+            )
+            self.assertEqual(results[:2], ["CC", "C"])
+            self.assertIsInstance(results[2], ParseFailure)
+            self.assertIsInstance(results[3], ParseFailure)
+            self.assertFalse(py2opsin(["water"], chunk_size=2))
+
+    def test_session_error(self):
+        """
+        Test that OPSIN dying inside a session gives False, however many chunks there are
+        """
+
+        def die(names, *args):
+            raise RuntimeError("OPSIN process exited unexpectedly with return code 1.")
+
+        with mock.patch.object(py2opsin_module, "_opsin_results", die):
+            for chunk_size in (1, 10):
+                with self.assertWarns(UserWarning):
+                    self.assertFalse(
+                        py2opsin(["ethane", "water"], chunk_size=chunk_size)
+                    )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,100 @@
+import importlib.util
+import unittest
+import warnings
+
+from py2opsin import OpsinResults, ParseFailure, py2opsin
+from py2opsin._core import compact_output, compact_pairs
+
+HAS_PANDAS = importlib.util.find_spec("pandas") is not None
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+class Test_OpsinResults(unittest.TestCase):
+    """
+    Test the compact result container returned with compact=True.
+    """
+
+    def setUp(self):
+        self.names = ["ethane", "bad_name", "water", "methane"]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            self.expected = py2opsin(self.names)
+            self.results = py2opsin(self.names, compact=True)
+
+    def test_matches_list(self):
+        """Compact results should hold the same values as the list py2opsin returns."""
+        self.assertIsInstance(self.results, OpsinResults)
+        self.assertEqual(len(self.results), len(self.names))
+        self.assertEqual(self.results, self.expected)
+        self.assertEqual(self.results.to_list(), self.expected)
+        self.assertEqual(self.results[-1], self.expected[-1])
+        self.assertEqual(self.results[1:3], self.expected[1:3])
+        with self.assertRaises(IndexError):
+            self.results[len(self.names)]
+
+    def test_failures(self):
+        """Failed names should be recorded, and given as ParseFailure if requested."""
+        self.assertEqual(self.results.failure_mask, bytearray([0, 1, 0, 0]))
+        failures = self.results.failures()
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0].name, "bad_name")
+        self.assertEqual(self.results[1], "")
+        results = py2opsin(self.names, compact=True, return_failures=True)
+        self.assertIsInstance(results[1], ParseFailure)
+
+    def test_warning(self):
+        """Failures should warn once, as without compact=True."""
+        with self.assertWarns(RuntimeWarning):
+            py2opsin(self.names, compact=True)
+
+    def test_single_name(self):
+        """A single name should still give a string."""
+        self.assertEqual(py2opsin("ethane", compact=True), py2opsin("ethane"))
+
+    def test_chunks(self):
+        """Results for several chunks should be joined in order."""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            results = py2opsin(self.names, compact=True, chunk_size=3)
+        self.assertEqual(results, self.expected)
+        self.assertEqual(results.failure_mask, bytearray([0, 1, 0, 0]))
+
+    def test_multiple_formats(self):
+        """A list of formats should give one OpsinResults per format."""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            results = py2opsin(self.names, ["SMILES", "InChI"], compact=True)
+        self.assertEqual(set(results), {"SMILES", "InChI"})
+        self.assertEqual(results["SMILES"], self.expected)
+
+    def test_compact_output(self):
+        """OPSIN output with Windows line endings should be split like any other."""
+        results = compact_output(b"CC\r\n\r\nO\r\n", ["ethane", "blah", "water"], "")
+        self.assertEqual(results, ["CC", "", "O"])
+        self.assertEqual(results.failures()[0].name, "blah")
+
+    def test_concatenate(self):
+        """Joined parts should keep their values and failures in place."""
+        first = compact_pairs(["ethane", "blah"], [("CC", None), ("", "bad")])
+        second = compact_pairs(["water"], [("O", None)])
+        joined = OpsinResults._concatenate([first, second], return_failures=True)
+        self.assertEqual(joined, ["CC", ParseFailure("blah", "bad"), "O"])
+        self.assertEqual(joined.nbytes, len(b"CC\n\nO\n") + 3 * 8)
+
+    @unittest.skipIf(not HAS_PANDAS, "pandas is not installed")
+    def test_to_pandas(self):
+        """Failed names should be None in a Series."""
+        series = self.results.to_pandas()
+        self.assertEqual(series.tolist(), [self.expected[0], None] + self.expected[2:])
+
+    @unittest.skipIf(not HAS_PYARROW, "pyarrow is not installed")
+    def test_to_arrow(self):
+        """Failed names should be null in an Arrow array."""
+        column = self.results.to_arrow()
+        self.assertEqual(
+            column.to_pylist(), [self.expected[0], None] + self.expected[2:]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
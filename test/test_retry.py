@@ -0,0 +1,63 @@
+import pickle
+import unittest
+import warnings
+
+from py2opsin import OpsinStats, ParseFailure, RelaxedResult, py2opsin
+
+
+class Test_retry_flags(unittest.TestCase):
+    """
+    Test retrying failed names with relaxed flags.
+    """
+
+    def test_relaxed_result(self):
+        """Names which need relaxed flags should say which flags parsed them."""
+        results = py2opsin(
+            ["ethane", "acetic"],
+            retry_flags=[{"allow_bad_stereo": True}, {"allow_acid": True}],
+        )
+        self.assertEqual(results[0], "CC")
+        self.assertNotIsInstance(results[0], RelaxedResult)
+        self.assertEqual(results[1], py2opsin("acetic", allow_acid=True))
+        self.assertIsInstance(results[1], RelaxedResult)
+        self.assertTrue(results[1].flags["allow_acid"])
+        self.assertFalse(results[1].flags["allow_bad_stereo"])
+
+    def test_only_failures_resent(self):
+        """Only names which failed should be sent to OPSIN again."""
+        with OpsinStats() as stats, warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            results = py2opsin(
+                ["ethane", "bad_name", "water"],
+                retry_flags=[{"allow_radicals": True}, {"allow_acid": True}],
+                return_failures=True,
+            )
+        self.assertEqual(results[0::2], ["CC", "O"])
+        self.assertIsInstance(results[1], ParseFailure)
+        totals = stats.snapshot()
+        self.assertEqual(
+            totals["bytes_in"], len("ethane\nbad_name\nwater\n") + 2 * len("bad_name\n")
+        )
+        self.assertIn("retry", totals["stages"])
+
+    def test_no_failures(self):
+        """Nothing should be retried when every name parses."""
+        with OpsinStats() as stats:
+            py2opsin(["ethane", "water"], retry_flags=[{"allow_acid": True}])
+        self.assertEqual(stats.snapshot()["spawns"], 1)
+
+    def test_unknown_flag(self):
+        """Only the four flags can be relaxed."""
+        with self.assertRaises(RuntimeError):
+            py2opsin("ethane", retry_flags=[{"jar_fpath": "other.jar"}])
+
+    def test_pickle(self):
+        """RelaxedResult should survive being sent between processes."""
+        result = RelaxedResult("CC(=O)O", {"allow_acid": True})
+        copy = pickle.loads(pickle.dumps(result))
+        self.assertEqual(copy, "CC(=O)O")
+        self.assertEqual(copy.flags, {"allow_acid": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import warnings
+
+from py2opsin import OpsinPool, OpsinSession, py2opsin, py2opsin_iter
+from py2opsin._core import OpsinWorker, active_session, finish_results, pair_messages
+
+# answers like OPSIN, failing names starting with "bad", after the JVM has
+# written a line of its own to stderr as it does with JAVA_TOOL_OPTIONS set
+NOISY_OPSIN = [
+    sys.executable,
+    "-c",
+    "import sys\n"
+    "sys.stderr.write('Picked up JAVA_TOOL_OPTIONS: -Xss1m\\n')\n"
+    "sys.stderr.flush()\n"
+    "for line in sys.stdin:\n"
+    "    name = line.strip()\n"
+    "    if name.startswith('bad'):\n"
+    "        sys.stderr.write(name + ' is unparsable\\n')\n"
+    "        sys.stderr.flush()\n"
+    "        name = ''\n"
+    "    sys.stdout.write(name + '\\n')\n"
+    "    sys.stdout.flush()\n",
+]
+
+
+class Test_OpsinSession(unittest.TestCase):
+    """
+    Test reusing a running OPSIN between calls.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        self.chemical_names = ["ethane", "water", "phenylalanine"]
+        self.chemical_smiles = ["CC", "O", "N[C@@H](CC1=CC=CC=C1)C(=O)O"]
+
+    def test_session_matches_py2opsin(self):
+        """A session should return the same results as a fresh OPSIN."""
+        with OpsinSession() as session:
+            self.assertEqual(session.convert("ethane"), "CC")
+            self.assertEqual(session.convert(self.chemical_names), self.chemical_smiles)
+            self.assertEqual(
+                session.convert("water", output_format="StdInChIKey"),
+                "XLYOFNOQVPJJNP-UHFFFAOYSA-N",
+            )
+
+    def test_session_reuses_process(self):
+        """Consecutive calls inside a session should not start a new OPSIN."""
+        with OpsinSession() as session:
+            self.assertEqual(py2opsin("ethane"), "CC")
+            ((worker,),) = session._workers.values()
+            pid = worker.pid
+            self.assertEqual(py2opsin(self.chemical_names), self.chemical_smiles)
+            self.assertEqual(len(session._workers), 1)
+            self.assertEqual(worker.pid, pid)
+
+    def test_session_failures(self):
+        """Names OPSIN cannot parse come back empty with a warning."""
+        with OpsinSession() as session:
+            with self.assertWarns(RuntimeWarning):
+                result = session.convert(["methane", "blah", "", "water"])
+            self.assertEqual(result, ["C", "", "", "O"])
+
+    def test_jvm_stderr_ignored(self):
+        """Lines the JVM writes to stderr should not be taken for OPSIN's messages."""
+        worker = OpsinWorker(NOISY_OPSIN)
+        try:
+            results = worker.convert(["bad1", "ok", "bad2"])
+        finally:
+            worker.close()
+        self.assertEqual(
+            results,
+            [("", "bad1 is unparsable"), ("ok", None), ("", "bad2 is unparsable")],
+        )
+        self.assertEqual(
+            pair_messages(
+                ["", "ok", ""],
+                "Picked up JAVA_TOOL_OPTIONS: -Xss1m\nbad1 is unparsable\nbad2 is unparsable\n",
+            ),
+            results,
+        )
+
+    def test_unpaired_messages(self):
+        """If error lines and failures cannot be matched up, the error output should be warned about once."""
+        names = ["bad{:d}".format(i) for i in range(2000)]
+        err_str = "\n".join("error {:d}".format(i) for i in range(1000)) + "\n"
+        results = pair_messages([""] * len(names), err_str, names)
+        self.assertEqual(results[5][1], "bad5 could not be parsed.")
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            finish_results(names, results, return_failures=False)
+        (warning,) = caught
+        self.assertEqual(str(warning.message).count("error 999"), 1)
+        self.assertLess(len(str(warning.message)), 2 * len(err_str))
+
+    def test_session_per_thread(self):
+        """A session should only be used by the thread which entered it, and the threads it hands work to."""
+        with OpsinSession() as session:
+            seen = []
+            thread = threading.Thread(
+                target=lambda: seen.append(active_session("default"))
+            )
+            thread.start()
+            thread.join()
+            self.assertEqual(seen, [None])
+            self.assertIs(active_session("default"), session)
+            self.assertEqual(
+                py2opsin(["ethane", "water"], chunk_size=1, chunk_workers=2),
+                ["CC", "O"],
+            )
+            self.assertEqual(len(session._workers), 1)
+        self.assertIsNone(active_session("default"))
+
+    def test_session_rejects_cml(self):
+        """CML cannot be streamed, so the session should refuse it."""
+        with OpsinSession() as session:
+            with self.assertRaises(RuntimeError):
+                session.convert("ethane", output_format="CML")
+
+    def test_pool_preserves_order(self):
+        """A pool should split a list over its workers and keep the order."""
+        names = self.chemical_names * 5
+        with OpsinPool(n_workers=3) as pool:
+            self.assertEqual(pool.convert(names), self.chemical_smiles * 5)
+            ((*workers,),) = pool._workers.values()
+            self.assertEqual(len({worker.pid for worker in workers}), 3)
+            self.assertEqual(py2opsin("water"), "O")
+
+    def test_iter_generator(self):
+        """py2opsin_iter should accept a generator and yield results in order."""
+        names = (name for name in self.chemical_names * 3)
+        results = py2opsin_iter(names, buffer_size=2)
+        self.assertEqual(next(results), "CC")
+        self.assertEqual(
+            list(results), self.chemical_smiles[1:] + self.chemical_smiles * 2
+        )
+
+    def test_iter_file(self):
+        """py2opsin_iter should read names straight from an open file."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fpath = os.path.join(tmpdir, "names.txt")
+            with open(fpath, "w") as file:
+                file.write("ethane\nblah\nwater\n")
+            with open(fpath) as file:
+                with self.assertWarns(RuntimeWarning):
+                    results = list(py2opsin_iter(file))
+        self.assertEqual(results, ["CC", "", "O"])
+
+    def test_iter_rejects_cml(self):
+        """CML cannot be streamed, which should be reported right away."""
+        with self.assertRaises(RuntimeError):
+            py2opsin_iter(["ethane"], output_format="CML")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import warnings
+
+from py2opsin import (
+    OpsinCache,
+    OpsinPool,
+    OpsinSession,
+    OpsinStats,
+    add_stats_hook,
+    py2opsin,
+    remove_stats_hook,
+)
+
+
+class Test_stats(unittest.TestCase):
+    """
+    Test the opt-in instrumentation of conversions.
+    """
+
+    def test_py2opsin_stats(self):
+        """A call should be recorded with its names, failures, bytes, and stages."""
+        with OpsinStats() as stats:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                py2opsin(["ethane", "water", "bad_name"])
+        totals = stats.snapshot()
+        self.assertEqual(totals["calls"], 1)
+        self.assertEqual(totals["names"], 3)
+        self.assertEqual(totals["failures"], 1)
+        self.assertEqual(totals["spawns"], 1)
+        self.assertEqual(totals["bytes_in"], len("ethane\nwater\nbad_name\n"))
+        self.assertGreater(totals["bytes_out"], 0)
+        self.assertGreater(totals["names_per_second"], 0)
+        for stage in ("write", "opsin", "decode", "warnings"):
+            self.assertIn(stage, totals["stages"])
+
+    def test_session_stats(self):
+        """Only the first call through a session should launch OPSIN."""
+        with OpsinSession() as session, OpsinStats() as stats:
+            py2opsin("ethane")
+            session.convert(["water", "methanol"])
+        totals = stats.snapshot()
+        self.assertEqual(totals["calls"], 2)
+        self.assertEqual(totals["names"], 3)
+        self.assertEqual(totals["spawns"], 1)
+
+    def test_pool_stats(self):
+        """Work done on a pool's worker threads should count towards the call."""
+        with OpsinPool(n_workers=2) as pool, OpsinStats() as stats:
+            pool.convert(["ethane", "water", "methanol", "ethanol"])
+        totals = stats.snapshot()
+        self.assertEqual(totals["calls"], 1)
+        self.assertEqual(totals["spawns"], 2)
+        self.assertEqual(totals["bytes_in"], len("ethane\nwater\nmethanol\nethanol\n"))
+
+    def test_cache_stats(self):
+        """Cache lookups should be timed, and cached names should not reach OPSIN."""
+        cache = OpsinCache()
+        py2opsin("ethane", cache=cache)
+        with OpsinStats() as stats:
+            py2opsin("ethane", cache=cache)
+        totals = stats.snapshot()
+        self.assertEqual(totals["spawns"], 0)
+        self.assertIn("cache", totals["stages"])
+
+    def test_hook(self):
+        """Hooks should receive one CallStats per call until removed."""
+        calls = []
+        add_stats_hook(calls.append)
+        try:
+            py2opsin("ethane")
+        finally:
+            remove_stats_hook(calls.append)
+        py2opsin("ethane")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0].entry, "py2opsin")
+        self.assertEqual(calls[0].names, 1)
+
+    def test_failing_hook(self):
+        """A broken hook should warn rather than break the conversion."""
+
+        def hook(call):
+            raise ValueError("broken")
+
+        add_stats_hook(hook)
+        try:
+            with self.assertWarns(RuntimeWarning):
+                self.assertTrue(py2opsin("ethane"))
+        finally:
+            remove_stats_hook(hook)
+
+    def test_reset(self):
+        """reset should zero every total."""
+        with OpsinStats() as stats:
+            py2opsin("ethane")
+        stats.reset()
+        self.assertEqual(stats.snapshot()["calls"], 0)
+        self.assertEqual(stats.snapshot()["stages"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
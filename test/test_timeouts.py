@@ -0,0 +1,94 @@
+import sys
+import time
+import unittest
+
+from py2opsin import OpsinSession, ParseFailure, py2opsin
+from py2opsin._core import OpsinWorker, TimeoutMessage
+
+# answers like OPSIN, one line per name, but hangs on the name "stall"
+STALLING_OPSIN = [
+    sys.executable,
+    "-c",
+    "import sys, time\n"
+    "for line in sys.stdin:\n"
+    "    if line.strip() == 'stall':\n"
+    "        time.sleep(60)\n"
+    "    sys.stdout.write(line.strip().upper() + '\\n')\n"
+    "    sys.stdout.flush()\n",
+]
+
+# the same, but taking 1.5 seconds to start, like a JVM loading OPSIN
+SLOW_STARTING_OPSIN = [
+    sys.executable,
+    "-c",
+    "import time\ntime.sleep(1.5)\n" + STALLING_OPSIN[2],
+]
+
+
+class Test_timeouts(unittest.TestCase):
+    """
+    Test giving up on names which take too long.
+    """
+
+    def test_name_timeout(self):
+        """A stalled name should fail alone, with OPSIN restarted for the rest."""
+        worker = OpsinWorker(STALLING_OPSIN)
+        try:
+            first_pid = worker.pid
+            start = time.time()
+            results = worker.convert(["a", "stall", "b", "c"], name_timeout=1)
+            self.assertLess(time.time() - start, 30)
+            self.assertEqual(results[0], ("A", None))
+            self.assertEqual(results[1][0], "")
+            self.assertIsInstance(results[1][1], TimeoutMessage)
+            self.assertEqual(results[2:], [("B", None), ("C", None)])
+            self.assertNotEqual(worker.pid, first_pid)
+        finally:
+            worker.close()
+
+    def test_slow_start(self):
+        """Starting OPSIN should not count against the first name, including after a restart."""
+        worker = OpsinWorker(SLOW_STARTING_OPSIN)
+        try:
+            results = worker.convert(["a", "stall", "b"], timeout=30, name_timeout=1)
+            self.assertEqual(results[0], ("A", None))
+            self.assertIsInstance(results[1][1], TimeoutMessage)
+            self.assertEqual(results[2], ("B", None))
+        finally:
+            worker.close()
+
+    def test_call_timeout(self):
+        """Once the call's time is up, every name left should fail."""
+        worker = OpsinWorker(STALLING_OPSIN)
+        try:
+            results = worker.convert(["a", "stall", "b"], timeout=1)
+            self.assertEqual(results[0], ("A", None))
+            for output, message in results[1:]:
+                self.assertEqual(output, "")
+                self.assertIsInstance(message, TimeoutMessage)
+            # the worker should be usable again afterwards
+            self.assertEqual(worker.convert(["d"], timeout=30), [("D", None)])
+        finally:
+            worker.close()
+
+    def test_py2opsin_timeout(self):
+        """Generous timeouts should not change results, and none should fail everything."""
+        names = ["ethane", "water", "blah"]
+        self.assertEqual(
+            py2opsin(names, timeout=60, name_timeout=30, return_failures=True),
+            py2opsin(names, return_failures=True),
+        )
+        results = py2opsin(names, timeout=0, return_failures=True)
+        self.assertTrue(all(isinstance(result, ParseFailure) for result in results))
+
+    def test_session_timeout(self):
+        """Sessions should accept the same timeouts."""
+        with OpsinSession() as session:
+            self.assertEqual(
+                session.convert(["ethane"], timeout=60, name_timeout=30),
+                session.convert(["ethane"]),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
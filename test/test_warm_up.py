@@ -0,0 +1,49 @@
+import unittest
+
+from py2opsin import OpsinPool, OpsinSession, OpsinStats, WarmUpReport, py2opsin
+
+
+class Test_warm_up(unittest.TestCase):
+    """
+    Test warming OPSIN up before serving requests.
+    """
+
+    def test_warm_up(self):
+        """Warming up should start OPSIN and run until the rate levels off."""
+        with OpsinSession() as session:
+            self.assertFalse(session.ready)
+            report = session.warm_up(min_names=2000, tolerance=10.0)
+            self.assertIsInstance(report, WarmUpReport)
+            self.assertTrue(report.steady)
+            self.assertTrue(session.ready)
+            self.assertGreaterEqual(report.names, 2000)
+            self.assertGreaterEqual(report.rounds, 2)
+            self.assertGreater(report.rate, 0)
+            # the warm OPSIN answers py2opsin without starting another
+            with OpsinStats() as stats:
+                py2opsin("ethane")
+            self.assertEqual(stats.snapshot()["spawns"], 0)
+        self.assertFalse(session.ready)
+
+    def test_max_seconds(self):
+        """Warming up should give up after max_seconds, reporting it is not steady."""
+        with OpsinSession() as session:
+            report = session.warm_up(["ethane"], min_names=10**9, max_seconds=0.5)
+        self.assertFalse(report.steady)
+        self.assertFalse(session.ready)
+
+    def test_pool(self):
+        """Every process in a pool should be warmed up with the whole corpus."""
+        with OpsinPool(n_workers=2) as pool:
+            report = pool.warm_up(["ethane", "water"], min_names=1000, tolerance=10.0)
+        self.assertEqual(report.names % 2000, 0)
+
+    def test_empty_corpus(self):
+        """An empty corpus cannot warm anything up."""
+        with OpsinSession() as session:
+            with self.assertRaises(RuntimeError):
+                session.warm_up([])
+
+
+if __name__ == "__main__":
+    unittest.main()